@@ -1 +1,13 @@
-from .gui import GUI
+"""A GUI based fractal generator"""
+__all__ = ["GUI"]
+
+
+def __getattr__(name):
+    """
+    Import the GUI lazily so that tkinter is only needed to use it
+    """
+    if name == "GUI":
+        from .gui import GUI
+        return GUI
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,5 @@
+"""Entry point of python -m pyfractal"""
+import sys
+from .cli import main
+
+sys.exit(main())
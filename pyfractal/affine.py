@@ -0,0 +1,686 @@
+"""Module compiling fractal rules into composable affine maps"""
+from math import cos, sin
+import threading
+import numpy as np
+
+CULLED_LEAF_POINTS = 1024  # leaf subtree size when culling to a viewport
+
+
+def rotation_scale_matrix(theta, scale):
+    """
+    Return the 2x2 matrix (as nested tuples) rotating by theta and
+    scaling by a factor of scale
+    """
+    cos_t, sin_t = scale * cos(theta), scale * sin(theta)
+    return ((cos_t, -sin_t), (sin_t, cos_t))
+
+
+def apply_matrix(matrix, point):
+    """
+    Multiply the 2x2 matrix with point (x,y)
+    """
+    (m11, m12), (m21, m22) = matrix
+    return (m11 * point[0] + m12 * point[1],
+            m21 * point[0] + m22 * point[1])
+
+
+def reflect_matrix(chord, matrix):
+    """
+    Return reflection around the line through origin along chord
+    composed after the 2x2 matrix
+    raises ZeroDivisionError for a chord of zero length, as flip does
+    """
+    d_x, d_y = chord
+    norm = d_x**2 + d_y**2
+    r11, r12 = (d_x**2 - d_y**2) / norm, 2 * d_x * d_y / norm
+    (m11, m12), (m21, m22) = matrix
+    return ((r11 * m11 + r12 * m21, r11 * m12 + r12 * m22),
+            (r12 * m11 - r11 * m21, r12 * m12 - r11 * m22))
+
+
+def is_point_rule(rule):
+    """
+    True for rules of c type i.e. the length which is not fractalized
+    """
+    return rule[2] is None and rule[3] is None
+
+
+def convex_hull(points):
+    """
+    Return the convex hull of points ((N, 2) array) as an (H, 2) array
+    of its vertices in counter clockwise order (monotone chain)
+    """
+    points = np.unique(np.asarray(points, dtype=np.float64), axis=0)
+    if len(points) < 3:
+        return points
+
+    def half_hull(sorted_points):
+        """
+        Lower hull of points sorted by x then y
+        """
+        hull = []
+        for point in sorted_points.tolist():
+            while len(hull) >= 2 and (
+                    (hull[-1][0] - hull[-2][0]) * (point[1] - hull[-2][1]) -
+                    (hull[-1][1] - hull[-2][1]) * (point[0] - hull[-2][0])
+            ) <= 0:
+                hull.pop()
+            hull.append(point)
+        return hull[:-1]
+    return np.array(half_hull(points) + half_hull(points[::-1]))
+
+
+class AffineRules():
+    """
+    Rules (theta, scale, is_flipped, is_reversed) compiled into affine maps
+
+    Level m >= 2 of the curve, taken relative to its first point, is the
+    concatenation in rule order of level m-1 (relative to its first point)
+    mapped by linear(m)[i] and moved by offset(m)[i], reversed in order
+    if the rule is reversed.
+    Flip is a reflection F around the chord d of the sub curve and
+    reverse the reflection around its perpendicular bisector i.e.
+    p -> d - F(p) with the order of points reversed.
+    Rules of c type are single points at offset(m)[i] with a zero
+    linear part.
+    The maps depend only on the rules and the chords of the levels which
+    have a closed form, no point of the curve is needed to derive them.
+    The per level lists are grown lazily under a lock, the same rules
+    being used by the drawing thread and the mainloop.
+    """
+
+    def __init__(self, rules, base_length):
+        """
+        Compile the rules for curves of the given base_length
+        """
+        self.rules = [tuple(rule) for rule in rules]
+        self.base_length = base_length
+        self.is_point = np.array(
+            [is_point_rule(rule) for rule in self.rules], dtype=bool)
+        self.is_reversed = np.array(
+            [bool(rule[3]) for rule in self.rules], dtype=bool)
+        base = [(0.0, 0.0)]
+        for theta, scale_fac, _, _ in self.rules:
+            last_x, last_y = base[-1]
+            base.append((
+                last_x + base_length * scale_fac * cos(theta),
+                last_y + base_length * scale_fac * sin(theta)))
+        self.base = np.array(base, dtype=np.float64)
+        # per level lists, index 0 unused
+        self.chords = [None, base[-1]]
+        self.origins = [None, (0.0, 0.0)]
+        self.maps = [None, None]
+        self.radii = [None, float(np.max(np.hypot(*self.base.T)))]
+        self.hulls = [None, convex_hull(self.base)]
+        self.lock = threading.RLock()  # guards the growth of the lists
+
+    def compile_level(self):
+        """
+        Compile the maps of the level next to the last compiled one
+        """
+        chord = self.chords[-1]
+        last_x, last_y = 0.0, 0.0
+        linear, offset = [], []
+        for theta, scale_fac, is_flipped, is_reversed in self.rules:
+            if is_flipped is None and is_reversed is None:
+                last_x += self.base_length * cos(theta)
+                last_y += self.base_length * sin(theta)
+                linear.append(((0.0, 0.0), (0.0, 0.0)))
+                offset.append((last_x, last_y))
+                continue
+            matrix = rotation_scale_matrix(theta, scale_fac)
+            if is_flipped:
+                matrix = reflect_matrix(apply_matrix(matrix, chord), matrix)
+            d_x, d_y = apply_matrix(matrix, chord)
+            if is_reversed:
+                matrix = reflect_matrix((d_x, d_y), matrix)
+                matrix = tuple(tuple(-m for m in row) for row in matrix)
+                offset.append((last_x + d_x, last_y + d_y))
+            else:
+                offset.append((last_x, last_y))
+            linear.append(matrix)
+            last_x += d_x
+            last_y += d_y
+        # the level starts at its first point, moved by a leading c rule
+        first_x, first_y = offset[0] if self.is_point[0] else (0.0, 0.0)
+        offset = [(o_x - first_x, o_y - first_y) for o_x, o_y in offset]
+        self.chords.append((last_x - first_x, last_y - first_y))
+        origin_x, origin_y = self.origins[-1]
+        self.origins.append((origin_x + first_x, origin_y + first_y))
+        self.maps.append((
+            np.array(linear, dtype=np.float64),
+            np.array(offset, dtype=np.float64)))
+
+    def level_maps(self, level):
+        """
+        Return (linear, offset) arrays of shape (R, 2, 2) and (R, 2)
+        mapping level-1 to each part of level
+        """
+        if len(self.maps) <= level:
+            with self.lock:
+                while len(self.maps) <= level:
+                    self.compile_level()
+        return self.maps[level]
+
+    def chord(self, level):
+        """
+        Vector from the first to the last point of the curve of level
+        """
+        self.level_maps(level)
+        return self.chords[level]
+
+    def origin(self, level):
+        """
+        Offset of the first point of the curve of level from the start
+        point, non zero only if the first rule is of c type
+        """
+        self.level_maps(level)
+        return self.origins[level]
+
+    def curve_size(self, level):
+        """
+        Number of points in the curve of level
+        """
+        n_points = int(self.is_point.sum())
+        size = len(self.rules) + 1
+        for _ in range(level - 1):
+            size = (len(self.rules) - n_points) * size + n_points
+        return size
+
+    def expand(self, linear, offset, is_reversed, is_point, level):
+        """
+        Replace the nodes of the given level (linear (K,2,2), offset (K,2),
+        is_reversed (K,), is_point (K,)) by their children, a node denoting
+        the points linear @ p + offset for p in the relative curve of
+        level (a single point at offset if is_point) reversed if
+        is_reversed
+        """
+        rule_linear, rule_offset = self.level_maps(level)
+        n_rules = len(self.rules)
+        counts = np.where(is_point, 1, n_rules)
+        parent = np.repeat(np.arange(len(counts)), counts)
+        position = np.arange(len(parent)) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        rule = np.where(is_reversed[parent], n_rules - 1 - position, position)
+        parent_linear = linear[parent]
+        new_linear = parent_linear @ rule_linear[rule]
+        new_offset = offset[parent] + np.einsum(
+            'kij,kj->ki', parent_linear, rule_offset[rule])
+        new_reversed = is_reversed[parent] ^ self.is_reversed[rule]
+        new_point = self.is_point[rule]
+        kept = is_point[parent]
+        if kept.any():  # points of upper levels are carried along
+            new_linear[kept] = parent_linear[kept]
+            new_offset[kept] = offset[parent[kept]]
+            new_reversed[kept] = False
+            new_point[kept] = True
+        return new_linear, new_offset, new_reversed, new_point
+
+    def compose(self, level, stop_level=1, linear=None,
+                offset=(0.0, 0.0), is_reversed=False, prune=None):
+        """
+        Precompose the maps from the curve of level down to the curve of
+        stop_level
+
+        Returns arrays (linear, offset, is_reversed, is_point) with one
+        entry per copy of the stop_level curve (or c type point) in order.
+        If prune is given, the copies of any level for which
+        prune(level, linear, offset) (on arrays of copies) is true are
+        replaced by the two points of their chord
+        """
+        if linear is None:
+            linear = np.eye(2)
+        nodes = (
+            np.array([linear], dtype=np.float64),
+            np.array([offset], dtype=np.float64),
+            np.array([is_reversed], dtype=bool),
+            np.array([False], dtype=bool))
+        for sub_level in range(level, stop_level - 1, -1):
+            if prune is not None:
+                is_pruned = ~nodes[3] & prune(sub_level, nodes[0], nodes[1])
+                if is_pruned.any():
+                    nodes = self.chord_points(nodes, is_pruned, sub_level)
+            if sub_level > stop_level:
+                nodes = self.expand(*nodes, sub_level)
+        return nodes
+
+    def chord_points(self, nodes, is_pruned, level):
+        """
+        Replace the nodes (see expand) of level where is_pruned by the
+        first and last points of their curve, in order
+        """
+        linear, offset, is_reversed, is_point = nodes
+        counts = np.where(is_pruned, 2, 1)
+        index = np.repeat(np.arange(len(counts)), counts)
+        starts = np.cumsum(counts) - counts
+        ends = offset[is_pruned] + linear[is_pruned] @ np.array(
+            self.chord(level), dtype=np.float64)
+        reversed_pruned = is_reversed[is_pruned][:, np.newaxis]
+        new_offset = offset[index]
+        new_offset[starts[is_pruned]] = np.where(
+            reversed_pruned, ends, offset[is_pruned])
+        new_offset[starts[is_pruned] + 1] = np.where(
+            reversed_pruned, offset[is_pruned], ends)
+        new_reversed = is_reversed[index] & ~is_pruned[index]
+        return (linear[index], new_offset, new_reversed,
+                is_point[index] | is_pruned[index])
+
+    def apply(self, nodes, sub_curve, out=None):
+        """
+        Apply composed maps nodes to sub_curve, the relative curve of
+        the level they were composed down to, and return the points
+        as an (N, 2) array
+
+        The points are written into out if given, a preallocated array
+        of the final size (any float dtype)
+        """
+        linear, offset, is_reversed, is_point = nodes
+        counts = np.where(is_point, 1, len(sub_curve))
+        if out is None:
+            out = np.empty((counts.sum(), 2), dtype=np.float64)
+        if not is_point.any():
+            curves = out.reshape(len(linear), len(sub_curve), 2)
+            np.matmul(sub_curve, linear.transpose(0, 2, 1), out=curves)
+            curves += offset[:, np.newaxis]
+            curves[is_reversed] = curves[is_reversed, ::-1]
+            return out
+        is_curve = ~is_point
+        curves = sub_curve @ linear[is_curve].transpose(0, 2, 1)
+        curves += offset[is_curve, np.newaxis]
+        is_reversed = is_reversed[is_curve]
+        curves[is_reversed] = curves[is_reversed, ::-1]
+        starts = np.cumsum(counts) - counts
+        out[starts[is_curve][:, np.newaxis] +
+            np.arange(len(sub_curve))] = curves
+        out[starts[is_point]] = offset[is_point]
+        return out
+
+    def relative_curve(self, level, dtype=np.float64):
+        """
+        Return the points of the curve of level relative to its first point
+        as an array of dtype
+
+        The maps are composed halfway down and applied to the relative
+        curve of that level, computed the same way, so that the work is
+        a single pass over the output
+        """
+        if level == 1:
+            return self.base if dtype == np.float64 else \
+                self.base.astype(dtype)
+        stop_level = max(1, level // 2)
+        return self.apply(
+            self.compose(level, stop_level),
+            self.relative_curve(stop_level, dtype),
+            np.empty((self.curve_size(level), 2), dtype=dtype))
+
+    def curve(self, level, start_point=(0.0, 0.0)):
+        """
+        Return the points of the curve of level starting at start_point
+        """
+        origin_x, origin_y = self.origin(level)
+        points = self.relative_curve(level)
+        if level == 1:
+            points = points.copy()
+        points += (start_point[0] + origin_x, start_point[1] + origin_y)
+        return points
+
+    def leaf_level(self, max_points):
+        """
+        Highest level whose curve has at most max_points points (at least 1)
+        """
+        level = 1
+        while self.curve_size(level + 1) <= max_points and \
+                self.curve_size(level + 1) > self.curve_size(level):
+            level += 1
+        return level
+
+    def radius(self, level):
+        """
+        Upper bound of the distance of the points of the curve of level
+        from its first point, derived recursively from the maps
+        """
+        if len(self.radii) <= level:
+            with self.lock:
+                while len(self.radii) <= level:
+                    rule_linear, rule_offset = self.level_maps(
+                        len(self.radii))
+                    scales = np.sqrt(np.abs(np.linalg.det(rule_linear)))
+                    self.radii.append(float(np.max(
+                        np.hypot(*rule_offset.T) + scales * self.radii[-1])))
+        return self.radii[level]
+
+    def hull(self, level):
+        """
+        Convex hull of the curve of level relative to its first point,
+        the hull of the hulls of the level-1 copies (and c type points)
+        i.e. O(hull size * rules) per level without generating points
+        """
+        if len(self.hulls) <= level:
+            with self.lock:
+                while len(self.hulls) <= level:
+                    rule_linear, rule_offset = self.level_maps(
+                        len(self.hulls))
+                    sub_hull = self.hulls[-1]
+                    self.hulls.append(convex_hull(np.concatenate(
+                        [rule_offset[self.is_point]] +
+                        [sub_hull @ linear.T + offset
+                         for linear, offset in zip(
+                             rule_linear[~self.is_point],
+                             rule_offset[~self.is_point])])))
+        return self.hulls[level]
+
+    def attractor_bound(self):
+        """
+        Depth independent bound of the curves as a disk (center, radius)
+        in the frame of their chord i.e. the first point at (0, 0) and the
+        last one at (1, 0), None if there is no such bound
+
+        Without c type rules the maps in this frame are the same for all
+        levels, if they are contractions the disk around the middle of the
+        chord mapped into itself by all of them and holding the base
+        curve holds every level (and the attractor of the rules)
+        """
+        if self.is_point.any():
+            return None
+        chords = [complex(*self.chord(level)) for level in (1, 2)]
+        if not all(chords):
+            return None
+        rule_linear, rule_offset = self.level_maps(2)
+        # similarity of the chord frame at level 1 and inverse at level 2
+        to_level = np.array([[chords[0].real, -chords[0].imag],
+                             [chords[0].imag, chords[0].real]])
+        inverse = np.array([[chords[1].real, chords[1].imag],
+                            [-chords[1].imag, chords[1].real]]) / \
+            abs(chords[1])**2
+        linear = inverse @ rule_linear @ to_level
+        offset = rule_offset @ inverse.T
+        scales = np.sqrt(np.abs(np.linalg.det(linear)))
+        if (scales >= 1).any():
+            return None
+        center = np.array((0.5, 0.0))
+        # base curve in the chord frame
+        base = np.array([complex(*point) / chords[0] for point in self.base])
+        radius = max(
+            float(np.max(np.hypot(
+                *(offset + linear @ center - center).T) / (1 - scales))),
+            float(np.max(np.abs(base - complex(*center)))))
+        return (0.5, 0.0), radius
+
+    def viewport_pruner(self, viewport):
+        """
+        Return a function (level, linear, offset) -> bool telling if the
+        subtree of level mapped by linear, offset is certainly outside
+        the viewport rectangle (x_min, y_min, x_max, y_max)
+        """
+        x_min, y_min, x_max, y_max = viewport
+
+        def is_outside(level, linear, offset):
+            """
+            Check if the disk bounding the subtree misses the viewport,
+            for a single subtree or arrays of them
+            """
+            scale = np.abs(linear[..., 0, 0] * linear[..., 1, 1] -
+                           linear[..., 0, 1] * linear[..., 1, 0]) ** 0.5
+            d_x = offset[..., 0] - np.clip(offset[..., 0], x_min, x_max)
+            d_y = offset[..., 1] - np.clip(offset[..., 1], y_min, y_max)
+            return d_x**2 + d_y**2 > (scale * self.radius(level))**2
+        return is_outside
+
+    def detail_pruner(self, view_scale, tolerance):
+        """
+        Return a function (level, linear, offset) -> bool telling if the
+        subtree of level mapped by linear, offset spans less than
+        tolerance once scaled by view_scale, i.e. is below the detail
+        that can be seen
+        """
+        def is_too_small(level, linear, offset):
+            """
+            Check if the disk bounding the subtree is below tolerance,
+            for a single subtree or arrays of them
+            """
+            scale = np.abs(linear[..., 0, 0] * linear[..., 1, 1] -
+                           linear[..., 0, 1] * linear[..., 1, 0]) ** 0.5
+            return scale * self.radius(level) * view_scale < tolerance
+        return is_too_small
+
+    def leaf_extent(self, level):
+        """
+        Upper bound of the extent (see radius) of the copies of the base
+        curve in the curve of level
+        """
+        extent = self.radius(1)
+        for sub_level in range(2, level + 1):
+            rule_linear, _ = self.level_maps(sub_level)
+            extent *= float(np.max(np.sqrt(np.abs(np.linalg.det(
+                rule_linear[~self.is_point]))), initial=0.0))
+        return extent
+
+    def detail_level(self, level, view_scale, tolerance):
+        """
+        Highest level below level whose every copy in the curve of level
+        spans less than tolerance once scaled by view_scale, i.e. below
+        which the detail can not be seen, level if there is none
+        """
+        scale = 1.0
+        for sub_level in range(level, 1, -1):
+            rule_linear, _ = self.level_maps(sub_level)
+            scale *= float(np.max(np.sqrt(np.abs(np.linalg.det(
+                rule_linear[~self.is_point]))), initial=0.0))
+            if scale * self.radius(sub_level - 1) * view_scale < tolerance:
+                return sub_level - 1
+        return level
+
+    def detail_size(self, level, view_scale, tolerance, leaf_level=1):
+        """
+        Upper bound of the number of points of the curve of level walked
+        with the subtrees spanning less than tolerance once scaled by
+        view_scale replaced by their chord (see detail_pruner) and the
+        subtrees of leaf_level drawn whole
+
+        Whether a subtree is pruned depends only on its level and scale,
+        so the subtrees are counted per distinct scale a level at a time
+        rather than walked
+        """
+        n_point_rules = int(self.is_point.sum())
+        scales = {1.0: 1}  # number of subtrees of each scale
+        size = 0
+        for sub_level in range(level, 0, -1):
+            rule_linear, _ = self.level_maps(max(sub_level, 2))
+            rule_scales = np.sqrt(np.abs(np.linalg.det(
+                rule_linear[~self.is_point]))).tolist()
+            sub_scales = {}
+            for scale, count in scales.items():
+                if scale * self.radius(sub_level) * view_scale < tolerance:
+                    size += 2 * count
+                elif sub_level <= leaf_level:
+                    size += count * self.curve_size(sub_level)
+                else:
+                    size += count * n_point_rules
+                    for rule_scale in rule_scales:
+                        key = float("{:.12g}".format(scale * rule_scale))
+                        sub_scales[key] = sub_scales.get(key, 0) + count
+            scales = sub_scales
+        return size
+
+    def auto_level(self, view_size, tolerance, max_level):
+        """
+        Smallest level (at most max_level) at which every copy of the base
+        curve spans less than tolerance when the whole curve, whose size
+        grows with the level, is displayed over view_size
+        """
+        level = 1
+        while level < max_level and self.radius(level) > 0 and \
+                self.leaf_extent(level) / self.radius(level) * view_size \
+                >= tolerance:
+            level += 1
+        return level
+
+    def iter_chunks(self, level, start_point=(0.0, 0.0), chunk_size=65536,
+                    dtype=np.float64, viewport=None, tolerance=None,
+                    view_scale=1.0, progress=None):
+        """
+        Yield the points of the curve of level as (n, 2) arrays of dtype
+        of chunk_size points (the last one possibly smaller)
+
+        The rule tree is walked depth first down to the highest level
+        fitting in a chunk, whose relative curve is computed once and
+        mapped for every subtree, so the working memory is O(level)
+        maps besides the chunk buffers.
+        If viewport (x_min, y_min, x_max, y_max) is given the subtrees
+        whose bounding disk misses it are replaced by their chord, finer
+        subtrees being used as leaves so that the output is proportional
+        to the visible part of the curve.
+        Likewise if tolerance is given the subtrees spanning less than
+        tolerance once scaled by view_scale are replaced by their chord,
+        the leaves being no higher than the level where every subtree is
+        (see detail_level) so that no leaf draws invisible detail.
+        progress is passed to iter_subtrees
+        """
+        pruners = []
+        batch_level = leaf_level = min(level, self.leaf_level(chunk_size))
+        if viewport is not None:
+            pruners.append(self.viewport_pruner(viewport))
+        if tolerance is not None:
+            pruners.append(self.detail_pruner(view_scale, tolerance))
+            leaf_level = min(leaf_level, self.detail_level(
+                level, view_scale, tolerance))
+        prune = None
+        if pruners:
+            def prune(sub_level, linear, offset):
+                """
+                Check if any of the pruners discards the subtree (or each
+                of arrays of subtrees)
+                """
+                is_pruned = pruners[0](sub_level, linear, offset)
+                for pruner in pruners[1:]:
+                    is_pruned = is_pruned | pruner(sub_level, linear, offset)
+                return is_pruned
+            leaf_level = min(leaf_level, self.leaf_level(CULLED_LEAF_POINTS))
+        leaf_curve = self.relative_curve(leaf_level)
+        buffer = np.empty((chunk_size, 2), dtype=dtype)
+        filled = 0
+        for points in self.iter_subtrees(level, leaf_level, leaf_curve,
+                                         start_point, prune, progress,
+                                         batch_level):
+            while len(points):
+                taken = min(len(points), chunk_size - filled)
+                buffer[filled:filled + taken] = points[:taken]
+                points = points[taken:]
+                filled += taken
+                if filled == chunk_size:
+                    yield buffer.copy()
+                    filled = 0
+        if filled:
+            yield buffer[:filled].copy()
+
+    def iter_subtrees(self, level, leaf_level, leaf_curve,
+                      start_point=(0.0, 0.0), prune=None, progress=None,
+                      batch_level=None):
+        """
+        Walk the rule tree depth first, yielding in order the points of
+        each subtree of leaf_level (leaf_curve being its relative curve)
+        and of each c type point above it
+
+        Subtrees for which prune(level, linear, offset) is true are not
+        descended into, their chord (first and last point) is yielded.
+        The subtrees of batch_level if given are walked at once (see
+        compose) rather than node by node.
+        progress(fraction) is called after each subtree with the fraction
+        of the leaves (points of the whole curve) walked through
+        """
+        origin_x, origin_y = self.origin(level)
+        sizes = [self.curve_size(sub_level) for sub_level in range(level + 1)]
+        done = 0
+        # stack of [level, linear, offset, is_reversed, next child]
+        stack = [[level, np.eye(2),
+                  np.array((start_point[0] + origin_x,
+                            start_point[1] + origin_y)), False, 0]]
+        n_rules = len(self.rules)
+        while stack:
+            node = stack[-1]
+            node_level, linear, offset, is_reversed, child = node
+            if child == 0 and prune is not None and \
+                    prune(node_level, linear, offset):
+                stack.pop()
+                chord = np.array(
+                    [offset, offset + linear @ self.chord(node_level)])
+                yield chord[::-1] if is_reversed else chord
+                done += sizes[node_level]
+                if progress is not None:
+                    progress(done / sizes[level])
+                continue
+            if node_level == leaf_level:
+                stack.pop()
+                points = leaf_curve @ linear.T + offset
+                yield points[::-1] if is_reversed else points
+                done += sizes[node_level]
+                if progress is not None:
+                    progress(done / sizes[level])
+                continue
+            if batch_level is not None and node_level <= batch_level:
+                stack.pop()
+                yield self.apply(self.compose(
+                    node_level, leaf_level, linear, offset, is_reversed,
+                    prune), leaf_curve)
+                done += sizes[node_level]
+                if progress is not None:
+                    progress(done / sizes[level])
+                continue
+            if child == n_rules:
+                stack.pop()
+                continue
+            node[4] += 1
+            rule = n_rules - 1 - child if is_reversed else child
+            rule_linear, rule_offset = self.level_maps(node_level)
+            sub_offset = offset + linear @ rule_offset[rule]
+            if self.is_point[rule]:
+                yield sub_offset[np.newaxis]
+                done += 1
+                continue
+            stack.append([
+                node_level - 1, linear @ rule_linear[rule], sub_offset,
+                is_reversed ^ self.is_reversed[rule], 0])
+
+    def locate(self, level, indices, start_point=(0.0, 0.0)):
+        """
+        Return the points at the given indices (array of ints) of the curve
+        of level as an (n, 2) array without generating the curve
+
+        Each index is decoded as mixed radix digits selecting a rule per
+        level (c type rules counting as a single point) and the maps of
+        the selected rules are composed, O(level) per index
+        """
+        size = self.curve_size(level)
+        if size > np.iinfo(np.int64).max:
+            raise OverflowError("Curve too large to be indexed")
+        indices = np.array(indices, dtype=np.int64).reshape(-1)
+        indices = np.where(indices < 0, indices + size, indices)
+        if ((indices < 0) | (indices >= size)).any():
+            raise IndexError("Point index out of range")
+        n_indices = len(indices)
+        origin_x, origin_y = self.origin(level)
+        linear = np.broadcast_to(np.eye(2), (n_indices, 2, 2))
+        offset = np.empty((n_indices, 2), dtype=np.float64)
+        offset[:] = (start_point[0] + origin_x, start_point[1] + origin_y)
+        is_reversed = np.zeros(n_indices, dtype=bool)
+        is_done = np.zeros(n_indices, dtype=bool)  # at a c type point
+        for sub_level in range(level, 1, -1):
+            rule_linear, rule_offset = self.level_maps(sub_level)
+            sizes = np.where(self.is_point, 1, self.curve_size(sub_level - 1))
+            ends = np.cumsum(sizes)
+            # index in the order of the non reversed parent
+            indices = np.where(is_reversed, ends[-1] - 1 - indices, indices)
+            rule = np.searchsorted(ends, indices, side='right')
+            rule[is_done] = 0
+            indices = indices - ends[rule] + sizes[rule]
+            new_offset = offset + np.einsum(
+                'kij,kj->ki', linear, rule_offset[rule])
+            offset = np.where(is_done[:, np.newaxis], offset, new_offset)
+            linear = linear @ rule_linear[rule]
+            is_reversed = self.is_reversed[rule] & ~is_done
+            is_done |= self.is_point[rule]
+        indices = np.where(is_reversed, len(self.base) - 1 - indices, indices)
+        indices[is_done] = 0
+        points = offset + np.einsum(
+            'kij,kj->ki', linear, self.base[indices])
+        return np.where(is_done[:, np.newaxis], offset, points)
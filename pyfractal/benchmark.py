@@ -0,0 +1,253 @@
+"""Module to benchmark the generation and export of fractal curves"""
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from math import pi
+from time import perf_counter
+import numpy as np
+from .fastfractal import load_fractal, DEFAULT_CHUNK_SIZE
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+ENGINES = ("python", "numpy", "stream", "outofcore")
+PRIMITIVES = ("reflection", "flip", "rotate_scale", "reverse")
+EXPORT_FORMATS = ("png", "svg", "eps")  # deterministic outputs
+DEFAULT_REPEATS = 3  # the best time of the repeats is kept
+CHECKSUM_DECIMALS = 6  # points are rounded so engines agree
+REGRESSION_THRESHOLD = 0.1  # slowdown flagged as a regression
+BENCHMARK_VERSION = 1  # format of the saved results
+
+
+def points_checksum(chunks):
+    """
+    Return the sha256 of a curve given as a stream of point arrays (or
+    lists of points) rounded to CHECKSUM_DECIMALS
+    """
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        # adding 0.0 turns -0.0 into 0.0
+        rounded = np.round(np.asarray(chunk, dtype=np.float64),
+                           CHECKSUM_DECIMALS) + 0.0
+        digest.update(rounded.tobytes())
+    return digest.hexdigest()
+
+
+def file_checksum(filename):
+    """
+    Return the sha256 of the contents of filename
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(2**20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def peak_rss():
+    """
+    Return the peak resident memory of the process in bytes, None if it
+    can not be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kB on linux
+
+
+def generate(fractal, engine, depth, directory):
+    """
+    Generate the curve of depth with engine, out of core into directory
+    for "outofcore", return (points, checksum)
+    """
+    if engine == "python":
+        curve = fractal.fractal_curve(depth, engine="python")
+        return len(curve), points_checksum([curve])
+    if engine == "numpy":
+        curve = fractal.fractal_array(depth)
+        return len(curve), points_checksum([curve])
+    if engine == "outofcore":
+        # the chunks are checksummed as they are read back from the file
+        fractal.set_out_of_core(directory)
+        return fractal.estimate_cost(depth).points, points_checksum(
+            fractal.iter_points(depth, DEFAULT_CHUNK_SIZE))
+    # the chunks are checksummed as they are streamed, one at a time
+    return fractal.estimate_cost(depth).points, points_checksum(
+        fractal.iter_points(depth, DEFAULT_CHUNK_SIZE))
+
+
+def apply_primitive(fractal, primitive, curve):
+    """
+    Apply primitive of FastFractal once to every point of curve (list of
+    points) as the python engine does, return the transformed curve
+    """
+    first, last = curve[0], curve[-1]
+    if primitive == "reflection":
+        line = (last[0] - first[0], first[1] - last[1],
+                first[0] * last[1] - last[0] * first[1])
+        return [fractal.reflection(line, point) for point in curve]
+    if primitive == "flip":
+        return fractal.flip(first, last, curve)
+    if primitive == "rotate_scale":
+        return fractal.rotate_scale(first, pi / 3, 0.5, curve)
+    return fractal.reverse(first, last, curve)
+
+
+def export(fractal, image_format, depth, directory):
+    """
+    Export the curve of depth into a file of image_format in directory,
+    return its name
+    """
+    filename = os.path.join(directory, "curve." + image_format)
+    if image_format == "png":
+        fractal.save_png(filename, depth)
+    elif image_format == "svg":
+        fractal.save_svg(filename, depth)
+    else:
+        fractal.save_postscript(filename, depth)
+    return filename
+
+
+def time_case(kind, variant, path, depth, repeats=DEFAULT_REPEATS):
+    """
+    Worker: time the case kind ("engine", "primitive" or "export") of
+    variant (engine, primitive or format) on the curve of the json file
+    path at depth, return its result
+    """
+    best = None
+    # an untimed run at depth 1 loads the modules and code paths used
+    for repeat_depth in [1] + [depth] * repeats:
+        fractal = load_fractal(path)  # no cached geometry between repeats
+        with tempfile.TemporaryDirectory() as directory:
+            if kind == "primitive":
+                curve = fractal.fractal_array(repeat_depth).tolist()
+                start = perf_counter()
+                curve = apply_primitive(fractal, variant, curve)
+                seconds = perf_counter() - start
+                n_points, checksum = len(curve), points_checksum([curve])
+            elif kind == "export":
+                start = perf_counter()
+                filename = export(fractal, variant, repeat_depth, directory)
+                seconds = perf_counter() - start
+                n_points = fractal.estimate_cost(repeat_depth).points
+                checksum = file_checksum(filename)
+            else:
+                start = perf_counter()
+                n_points, checksum = generate(
+                    fractal, variant, repeat_depth, directory)
+                seconds = perf_counter() - start
+        if repeat_depth != 1 or depth == 1:
+            best = seconds if best is None else min(best, seconds)
+    return {
+        "kind": kind,
+        "variant": variant,
+        "curve": os.path.splitext(os.path.basename(path))[0],
+        "depth": depth,
+        "seconds": best,
+        "points": n_points,
+        "points_per_second": n_points / best if best else None,
+        "peak_rss": peak_rss(),
+        "checksum": checksum
+    }
+
+
+def cases(paths, depths, engines=ENGINES, primitives=(), export_formats=()):
+    """
+    Return the (kind, variant, path, depth) of the cases sweeping the
+    curves of the json files paths at depths for every engine, primitive
+    and export format
+    """
+    variants = [("engine", engine) for engine in engines] + \
+        [("primitive", primitive) for primitive in primitives] + \
+        [("export", image_format) for image_format in export_formats]
+    return [(kind, variant, path, depth)
+            for path in paths for depth in depths
+            for kind, variant in variants]
+
+
+def run(benchmark_cases, repeats=DEFAULT_REPEATS, report=None):
+    """
+    Run the cases each in a fresh process, so that their peak memory is
+    measured separately, calling report(result) after each, return the
+    results with a description of the environment
+    """
+    results = []
+    for kind, variant, path, depth in benchmark_cases:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(
+                time_case, kind, variant, path, depth, repeats).result()
+        results.append(result)
+        if report is not None:
+            report(result)
+    return {
+        "version": BENCHMARK_VERSION,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results
+    }
+
+
+def case_key(result):
+    """
+    Return the key identifying the case of result across runs
+    """
+    return (result["kind"], result["variant"], result["curve"],
+            result["depth"])
+
+
+def describe(result):
+    """
+    Return a line describing result
+    """
+    text = "{} {} {} depth {}: {:,} points in {:.4f} s".format(
+        result["kind"], result["variant"], result["curve"], result["depth"],
+        result["points"], result["seconds"])
+    if result["points_per_second"]:
+        text += ", {:,.0f} points/s".format(result["points_per_second"])
+    if result["peak_rss"]:
+        text += ", {:.1f} MB peak".format(result["peak_rss"] / 2**20)
+    return text
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Return the regressions of the results current against baseline as
+    lines: cases slower by more than threshold (fraction) and cases whose
+    checksum changed
+    """
+    baseline_results = {case_key(result): result
+                        for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = baseline_results.get(case_key(result))
+        if before is None:
+            continue
+        name = "{} {} {} depth {}".format(*case_key(result))
+        if result["checksum"] != before["checksum"]:
+            regressions.append("{}: checksum changed".format(name))
+        if result["seconds"] > before["seconds"] * (1 + threshold):
+            regressions.append("{}: {:.4f} s against {:.4f} s".format(
+                name, result["seconds"], before["seconds"]))
+    return regressions
+
+
+def save_results(results, filename):
+    """
+    Save the results of run as json into filename
+    """
+    with open(filename, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def load_results(filename):
+    """
+    Load results saved by save_results
+    """
+    with open(filename) as file:
+        return json.load(file)
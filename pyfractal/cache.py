@@ -0,0 +1,253 @@
+"""Module to cache generated curve geometry between draws"""
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_CACHE_BYTES = 256 * 2**20  # 256 MiB
+DEFAULT_DISK_CACHE_BYTES = 4 * 2**30  # 4 GiB
+MIN_DISK_CACHE_POINTS = 2**16  # smaller curves are faster to regenerate
+GEOMETRY_VERSION = 1  # bumped when the generated geometry changes
+STALE_SECONDS = 3600  # age of temporary files left by interrupted writes
+
+
+def rules_key(rules):
+    """
+    Return a canonical hash of the rules (list of
+    (theta, scale, is_flipped, is_reversed)) usable as cache key
+    """
+    canonical = json.dumps([
+        [float(theta), float(scale_fac),
+         None if is_flipped is None else bool(is_flipped),
+         None if is_reversed is None else bool(is_reversed)]
+        for theta, scale_fac, is_flipped, is_reversed in rules])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class GeometryCache():
+    """
+    Least recently used cache of curve levels (numpy arrays) keyed by
+    (rules_key, level), bounded by the total bytes of the arrays
+
+    The curves are stored in a normalized frame (unit base length,
+    relative to their first point) so that a cached level serves any
+    start point and base length through one affine transform, the
+    methods are thread safe (curves are generated in the background)
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        """
+        Initialize an empty cache holding at most max_bytes
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.n_bytes = 0
+        self.lock = threading.RLock()
+
+    def set_max_bytes(self, max_bytes):
+        """
+        Change the byte budget of the cache, evicting entries if needed
+        """
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+    def get(self, key, level):
+        """
+        Return the cached curve of level for rules key or None
+        """
+        with self.lock:
+            curve = self.entries.get((key, level))
+            if curve is not None:
+                self.entries.move_to_end((key, level))
+            return curve
+
+    def nearest(self, key, level):
+        """
+        Return (cached_level, curve) for the highest cached level of rules
+        key not above level, (None, None) if there is none
+        """
+        with self.lock:
+            cached = [
+                cached_level for cached_key, cached_level in self.entries
+                if cached_key == key and cached_level <= level]
+            if not cached:
+                return None, None
+            return max(cached), self.get(key, max(cached))
+
+    def put(self, key, level, curve):
+        """
+        Store the curve of level for rules key, arrays larger than the
+        whole budget are not stored
+        """
+        with self.lock:
+            if curve.nbytes > self.max_bytes:
+                return
+            self.discard(key, level)
+            curve.setflags(write=False)  # shared between draws
+            self.entries[(key, level)] = curve
+            self.n_bytes += curve.nbytes
+            self.evict()
+
+    def discard(self, key, level):
+        """
+        Remove the curve of level for rules key if cached
+        """
+        with self.lock:
+            curve = self.entries.pop((key, level), None)
+            if curve is not None:
+                self.n_bytes -= curve.nbytes
+
+    def evict(self):
+        """
+        Drop least recently used entries until within max_bytes
+        """
+        with self.lock:
+            while self.n_bytes > self.max_bytes:
+                _, curve = self.entries.popitem(last=False)
+                self.n_bytes -= curve.nbytes
+
+    def clear(self):
+        """
+        Remove all the entries
+        """
+        with self.lock:
+            self.entries.clear()
+            self.n_bytes = 0
+
+
+def default_cache_directory():
+    """
+    Return the directory of the per user cache of pyfractal
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME",
+                              os.path.expanduser("~/.cache"))
+    return os.path.join(base, "pyfractal")
+
+
+class DiskCache():
+    """
+    Persistent cache of normalized curve levels stored as .npy files named
+    by the hash of (rules_key, level, GEOMETRY_VERSION), bounded by their
+    total bytes, least recently used files being evicted
+
+    Curves are loaded memory mapped and read only so that opening a large
+    cached curve reads nothing until its points are used. Files are
+    written under a temporary name then renamed (atomic within a
+    directory) so that processes sharing the directory never read a
+    partial file
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_DISK_CACHE_BYTES):
+        """
+        Initialize the cache in directory (default_cache_directory if
+        None), created if needed, holding at most max_bytes
+        """
+        self.directory = directory or default_cache_directory()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key, level):
+        """
+        Return the file of the curve of level for rules key
+        """
+        name = hashlib.sha256("{}:{}:{}".format(
+            key, level, GEOMETRY_VERSION).encode()).hexdigest()
+        return os.path.join(self.directory, name + ".npy")
+
+    def get(self, key, level):
+        """
+        Return the cached curve of level for rules key as a read only
+        memory mapped array or None
+        """
+        path = self.path(key, level)
+        try:
+            curve = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):  # unreadable, drop it
+            self.discard(key, level)
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return curve
+
+    def put(self, key, level, curve):
+        """
+        Store the curve of level for rules key, curves of less than
+        MIN_DISK_CACHE_POINTS points or larger than the whole budget are
+        not stored
+        """
+        if len(curve) < MIN_DISK_CACHE_POINTS or \
+                curve.nbytes > self.max_bytes:
+            return
+        file = tempfile.NamedTemporaryFile(
+            dir=self.directory, suffix=".tmp", delete=False)
+        try:
+            with file:
+                np.save(file, curve)
+            os.replace(file.name, self.path(key, level))
+        except OSError:
+            if os.path.exists(file.name):
+                os.remove(file.name)
+            return
+        self.evict()
+
+    def discard(self, key, level):
+        """
+        Remove the curve of level for rules key if cached
+        """
+        try:
+            os.remove(self.path(key, level))
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Remove least recently used files until within max_bytes, and
+        temporary files older than STALE_SECONDS
+        """
+        now = time.time()
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*")):
+            try:
+                stat = os.stat(path)
+                if path.endswith(".tmp"):
+                    if now - stat.st_mtime > STALE_SECONDS:
+                        os.remove(path)
+                elif path.endswith(".npy"):
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:  # removed meanwhile by another process
+                continue
+        n_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if n_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # in use (windows) or already removed
+                continue
+            n_bytes -= size
+
+    def clear(self):
+        """
+        Remove all the cached curves
+        """
+        for path in glob.glob(os.path.join(self.directory, "*.npy")):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
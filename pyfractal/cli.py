@@ -0,0 +1,366 @@
+"""Command line interface of pyfractal, without the GUI"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from pkg_resources import resource_filename, resource_listdir, \
+    get_distribution, DistributionNotFound
+from .cache import default_cache_directory, GEOMETRY_VERSION
+from .fastfractal import load_fractal
+from . import benchmark
+from . import raster
+from . import tiles
+
+FORMATS = ("png", "svg", "svgz", "eps", "ps")
+BENCHMARK_CURVES = ("3_TerDragon", "3_Curve5_Horse", "4_CesaroSweep")
+RENDER_MANIFEST = ".pyfractal-render.json"  # parameters of the outputs
+
+
+def bundled_curves():
+    """
+    Return the names of the curves bundled with the package
+    """
+    return sorted(name[:-len(".json")]
+                  for name in resource_listdir('pyfractal', 'curves')
+                  if name.endswith(".json"))
+
+
+def curve_path(name):
+    """
+    Return the path of the curve json file name, either a path or the
+    name of a bundled curve (case insensitive)
+    """
+    if os.path.isfile(name):
+        return name
+    for curve in bundled_curves():
+        if curve.lower() == name.lower():
+            return resource_filename('pyfractal', 'curves/' + curve + '.json')
+    raise argparse.ArgumentTypeError(
+        "{} is neither a file nor a bundled curve".format(name))
+
+
+def depth_range(text):
+    """
+    Return the list of depths of text made of comma separated depths or
+    inclusive ranges e.g. 3,5-7
+    """
+    depths = []
+    try:
+        for part in text.split(","):
+            low, _, high = part.partition("-")
+            depths.extend(range(int(low), int(high or low) + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "invalid depth range {}".format(text))
+    if not depths or min(depths) < 1:
+        raise argparse.ArgumentTypeError(
+            "invalid depth range {}".format(text))
+    return depths
+
+
+def image_size(text):
+    """
+    Return (width, height) of text WIDTHxHEIGHT or SIZE for a square
+    """
+    try:
+        width, _, height = text.lower().partition("x")
+        size = int(width), int(height or width)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid size {}".format(text))
+    if min(size) < 1:
+        raise argparse.ArgumentTypeError("invalid size {}".format(text))
+    return size
+
+
+def render_job(path, depth, output, size, out_of_core=None):
+    """
+    Worker: render the curve of the json file path at depth into output,
+    its format given by the extension, generating the curve into a file
+    of the directory out_of_core if given, return the number of points
+    of the curve and the seconds taken
+    """
+    start = perf_counter()
+    fractal = load_fractal(path)
+    fractal.set_out_of_core(out_of_core)
+    n_points = fractal.estimate_cost(depth).points
+    if output.endswith(".png"):
+        fractal.save_png(output, depth, width=size[0], height=size[1])
+    elif output.endswith((".svg", ".svgz")):
+        fractal.save_svg(output, depth)
+    else:
+        fractal.save_postscript(output, depth)
+    return n_points, perf_counter() - start
+
+
+def package_version():
+    """
+    Return the version of the installed package, None if not installed
+    """
+    try:
+        return get_distribution("pyfractal").version
+    except DistributionNotFound:
+        return None
+
+
+def render_parameters(path, depth, output, size):
+    """
+    Return the parameters output was rendered with as a dictionary
+    """
+    return {
+        "curve": os.path.abspath(path),
+        "depth": depth,
+        "size": list(size) if output.endswith(".png") else None,
+        "geometry": GEOMETRY_VERSION,
+        "version": package_version()
+    }
+
+
+def load_manifest(output_dir):
+    """
+    Return the render parameters of the outputs of output_dir keyed by
+    file name, empty if there is no (readable) manifest
+    """
+    try:
+        with open(os.path.join(output_dir, RENDER_MANIFEST)) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def save_manifest(output_dir, manifest):
+    """
+    Save the render parameters of the outputs of output_dir
+    """
+    filename = os.path.join(output_dir, RENDER_MANIFEST)
+    with open(filename + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(filename + ".tmp", filename)
+
+
+def is_up_to_date(output, path, parameters, manifest):
+    """
+    True if output exists, is not older than the curve file path and was
+    rendered with the same parameters (see render_parameters) according
+    to the manifest of its directory
+    """
+    return os.path.exists(output) and \
+        os.path.getmtime(output) >= os.path.getmtime(path) and \
+        manifest.get(os.path.basename(output)) == parameters
+
+
+def render(args):
+    """
+    Render every curve at every depth into every format on a pool of
+    processes, skipping outputs newer than their curve file and rendered
+    with the same parameters (recorded in a manifest of the output
+    directory) unless forced, return the exit status
+    """
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest = load_manifest(args.output_dir)
+    jobs = []
+    for path in args.curves:
+        name = os.path.splitext(os.path.basename(path))[0]
+        for depth in args.depth:
+            for image_format in args.format:
+                output = os.path.join(args.output_dir, "{}_{}.{}".format(
+                    name, depth, image_format))
+                parameters = render_parameters(path, depth, output, args.size)
+                if not args.force and \
+                        is_up_to_date(output, path, parameters, manifest):
+                    print("{}: up to date".format(output))
+                else:
+                    jobs.append((path, depth, output, parameters))
+    status = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            executor.submit(render_job, path, depth, output, args.size,
+                            args.out_of_core):
+            (output, parameters) for path, depth, output, parameters in jobs}
+        for future in as_completed(futures):
+            output, parameters = futures[future]
+            try:
+                n_points, seconds = future.result()
+            except Exception as error:  # report and go on with the others
+                print("{}: failed, {}".format(output, error),
+                      file=sys.stderr)
+                manifest.pop(os.path.basename(output), None)
+                status = 1
+                continue
+            manifest[os.path.basename(output)] = parameters
+            save_manifest(args.output_dir, manifest)
+            print("{}: {:,} points in {:.2f} s".format(
+                output, n_points, seconds))
+    return status
+
+
+def render_tiles(args):
+    """
+    Render the tile pyramid of the curve, return the exit status
+    """
+    start = perf_counter()
+
+    def report(zoom, counts):
+        """
+        Print the tiles done after each zoom
+        """
+        print("zoom {}: {written} written, {linked} linked, {skipped} "
+              "skipped".format(zoom, **counts))
+
+    tiles.render_pyramid(
+        args.curve, args.output_dir, args.max_zoom, args.depth,
+        args.tile_size, args.line_width, args.fill, args.jobs, report)
+    print("{}: tiles in {:.2f} s".format(
+        args.output_dir, perf_counter() - start))
+    return 0
+
+
+def run_benchmark(args):
+    """
+    Run the benchmark sweep, or load its results, save them and compare
+    them against a baseline, return the exit status (1 on regressions)
+    """
+    if args.results:
+        results = benchmark.load_results(args.results)
+        for result in results["results"]:
+            print(benchmark.describe(result))
+    else:
+        curves = args.curves or [curve_path(name) for name in BENCHMARK_CURVES]
+        results = benchmark.run(
+            benchmark.cases(curves, args.depth, args.engine,
+                            benchmark.PRIMITIVES if args.primitives else (),
+                            args.export),
+            args.repeats,
+            lambda result: print(benchmark.describe(result)))
+    if args.output:
+        benchmark.save_results(results, args.output)
+    if not args.compare:
+        return 0
+    regressions = benchmark.compare(
+        benchmark.load_results(args.compare), results, args.threshold)
+    for regression in regressions:
+        print("regression: " + regression)
+    return 1 if regressions else 0
+
+
+def parser():
+    """
+    Return the argument parser of the command line
+    """
+    main_parser = argparse.ArgumentParser(
+        prog="pyfractal",
+        description="Draw fractal curves, the GUI is started when no "
+        "command is given")
+    commands = main_parser.add_subparsers(dest="command")
+    render_parser = commands.add_parser(
+        "render", help="render curves into files without the GUI")
+    render_parser.add_argument(
+        "curves", nargs="+", type=curve_path, metavar="curve",
+        help="curve json file or name of a bundled curve")
+    render_parser.add_argument(
+        "-d", "--depth", type=depth_range, default=[1],
+        help="recursion depths e.g. 5 or 3-8 or 3,5 (default 1)")
+    render_parser.add_argument(
+        "-f", "--format", nargs="+", choices=FORMATS, default=["png"],
+        help="output formats (default png)")
+    render_parser.add_argument(
+        "-s", "--size", type=image_size, default=(1000, 1000),
+        help="size of png images WIDTHxHEIGHT (default 1000x1000)")
+    render_parser.add_argument(
+        "-o", "--output-dir", default=".",
+        help="directory of the rendered files (default current)")
+    render_parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of processes (default number of cpus)")
+    render_parser.add_argument(
+        "--force", action="store_true",
+        help="render outputs even if newer than their curve file")
+    render_parser.add_argument(
+        "--out-of-core", nargs="?", metavar="DIR",
+        const=os.path.join(default_cache_directory(), "out_of_core"),
+        help="generate the whole curves into files of DIR (default in "
+        "the user cache directory) read back in chunks, for curves larger "
+        "than memory")
+    render_parser.set_defaults(run=render)
+    tiles_parser = commands.add_parser(
+        "tiles", help="render a curve into a pyramid of png tiles "
+        "(zoom/x/y.png) for deep zoom viewers")
+    tiles_parser.add_argument(
+        "curve", type=curve_path,
+        help="curve json file or name of a bundled curve")
+    tiles_parser.add_argument(
+        "-z", "--max-zoom", type=int, default=4,
+        help="highest zoom level, 2**zoom tiles along each side (default 4)")
+    tiles_parser.add_argument(
+        "-d", "--depth", type=int, default=None,
+        help="recursion depth (default detailed down to a pixel at the "
+        "highest zoom)")
+    tiles_parser.add_argument(
+        "--tile-size", type=int, default=tiles.TILE_SIZE,
+        help="pixels along each side of a tile (default {})".format(
+            tiles.TILE_SIZE))
+    tiles_parser.add_argument(
+        "--line-width", type=float, default=raster.DEFAULT_LINE_WIDTH,
+        help="width of the lines in points (default {})".format(
+            raster.DEFAULT_LINE_WIDTH))
+    tiles_parser.add_argument(
+        "--fill", choices=raster.FILL_RULES, default=None,
+        help="fill the curve with this rule instead of drawing lines")
+    tiles_parser.add_argument(
+        "-o", "--output-dir", default="tiles",
+        help="directory of the tiles (default tiles)")
+    tiles_parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="number of processes (default number of cpus)")
+    tiles_parser.set_defaults(run=render_tiles)
+    benchmark_parser = commands.add_parser(
+        "benchmark",
+        help="time generation and export over curves, depths and engines")
+    benchmark_parser.add_argument(
+        "curves", nargs="*", type=curve_path, metavar="curve",
+        help="curve json files or names of bundled curves (default {})"
+        .format(", ".join(BENCHMARK_CURVES)))
+    benchmark_parser.add_argument(
+        "-d", "--depth", type=depth_range, default=[3, 4, 5, 6],
+        help="recursion depths e.g. 5 or 3-8 or 3,5 (default 3-6)")
+    benchmark_parser.add_argument(
+        "-e", "--engine", nargs="*", choices=benchmark.ENGINES,
+        default=list(benchmark.ENGINES), help="engines (default all)")
+    benchmark_parser.add_argument(
+        "-p", "--primitives", action="store_true",
+        help="time the primitives of the python engine")
+    benchmark_parser.add_argument(
+        "-x", "--export", nargs="*", choices=benchmark.EXPORT_FORMATS,
+        default=[], help="time the export into these formats")
+    benchmark_parser.add_argument(
+        "-r", "--repeats", type=int, default=benchmark.DEFAULT_REPEATS,
+        help="repeats of each case, the best time is kept (default {})"
+        .format(benchmark.DEFAULT_REPEATS))
+    benchmark_parser.add_argument(
+        "-o", "--output", help="json file to save the results into")
+    benchmark_parser.add_argument(
+        "--results", help="json file of results to use instead of running")
+    benchmark_parser.add_argument(
+        "--compare", metavar="BASELINE",
+        help="json file of results to flag regressions against")
+    benchmark_parser.add_argument(
+        "--threshold", type=float, default=benchmark.REGRESSION_THRESHOLD,
+        help="slowdown flagged as regression (default {})".format(
+            benchmark.REGRESSION_THRESHOLD))
+    benchmark_parser.set_defaults(run=run_benchmark)
+    return main_parser
+
+
+def main(argv=None):
+    """
+    Run the command line with argv (default sys.argv), return the exit
+    status
+    """
+    args = parser().parse_args(argv)
+    if args.command is None:
+        from .gui import GUI  # tkinter is only needed by the GUI
+        GUI().run()
+        return 0
+    return args.run(args)
@@ -1,6 +1,70 @@
 """Module for drawing fractals fastly by operations on points directly"""
+from collections import namedtuple
 from math import cos, sin
+import os
+import queue
+from time import perf_counter
+import numpy as np
+from .affine import AffineRules, CULLED_LEAF_POINTS
+from .cache import GeometryCache, DiskCache, rules_key, \
+    DEFAULT_DISK_CACHE_BYTES, GEOMETRY_VERSION
+from .parallel import parallel_relative_curve
+from . import outofcore
+from . import postprocess
+from . import raster
+from . import svg
+from . import postscript
 from .curve import Curve
+from .worker import Worker
+from .instrument import RECORDER
+
+ENGINES = ("python", "numpy")
+DEFAULT_CHUNK_SIZE = 65536  # points per chunk of streamed curves
+DRAW_TOLERANCE = 0.5  # pixels, simplification of curves drawn on canvas
+DRAW_FRAME_SECONDS = 0.02  # time spent drawing on the canvas per frame
+DRAW_FRAME_DELAY = 1  # milliseconds left to the mainloop between frames
+DRAW_POLL_DELAY = 10  # milliseconds between polls of the generation
+EXPORT_TOLERANCE = 0.25  # pixels, detail of curves saved as images
+# rough cost of generating curves, measured on a desktop machine
+# mode: (peak bytes per float64 point, points per second)
+COST_MODELS = {
+    "python": (350, 5e5),  # lists of tuples, copied once per rule
+    "list": (160, 4e6),  # numpy engine converted to a list of tuples
+    "numpy": (48, 2e7),  # result, cached level and temporary arrays
+    "stream": (0, 3e7),  # iter_points, memory bounded by a chunk
+}
+BUDGET_FALLBACKS = ("refuse", "stream")
+
+CostEstimate = namedtuple("CostEstimate", ["points", "bytes", "seconds"])
+
+
+def format_count(count):
+    """
+    Return the (possibly huge) int count as text, with thousands
+    separators or in scientific notation above a trillion
+    """
+    if count < 10**12:
+        return "{:,}".format(count)
+    digits = str(count)
+    return "{}.{}e{}".format(digits[0], digits[1:3], len(digits) - 1)
+
+
+def count_seconds(count, per_second):
+    """
+    Return the seconds taken by count (int) items at per_second, inf if
+    too large for a float
+    """
+    try:
+        return count / per_second
+    except OverflowError:
+        return float("inf")
+
+
+class BudgetExceededError(Exception):
+    """
+    Raised when generating a curve would exceed the budget set on
+    FastFractal
+    """
 
 
 class FastFractal():
@@ -26,6 +90,19 @@ class FastFractal():
         self.base_length = base_length
         self.parent = parent
         self.recursion_depth = 1
+        self.engine = "numpy"
+        self.dtype = np.float64  # dtype of generated point arrays
+        self.affine_rules = None  # (key, AffineRules) of compiled rules
+        self.normalized_rules = None  # (key, AffineRules) of unit length
+        self.cache = GeometryCache()
+        self.disk_cache = None  # persistent DiskCache, see set_disk_cache
+        self.out_of_core = None  # directory of curve files, set_out_of_core
+        self.draw_job = None  # (worker, id of the next frame) of the drawing
+        self.budget = {
+            "max_bytes": None,  # None for no limit
+            "max_seconds": None,
+            "fallback": "stream"  # one of BUDGET_FALLBACKS
+        }
         self.curve = Curve(self)
 
     def set_startpoint(self, point):
@@ -59,6 +136,121 @@ class FastFractal():
         """
         self.recursion_depth = recursion_depth
 
+    def set_engine(self, engine):
+        """
+        Set the engine used by fractal_curve, one of ENGINES
+        """
+        if engine not in ENGINES:
+            raise ValueError("Unknown engine " + repr(engine))
+        self.engine = engine
+
+    def set_dtype(self, dtype):
+        """
+        Set the dtype of generated point arrays, float64 or float32 (half
+        the memory at a precision good enough for drawing), the curves
+        being generated and cached in memory and on disk in that dtype
+        """
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError("Unsupported dtype " + str(dtype))
+        self.dtype = dtype
+
+    def set_budget(self, max_bytes=None, max_seconds=None, fallback="stream"):
+        """
+        Set the memory and time budget of curve generation (None for no
+        limit), fallback tells what happens when a curve held in memory
+        would exceed it: "refuse" or "stream" the curve when possible
+        """
+        if fallback not in BUDGET_FALLBACKS:
+            raise ValueError("Unknown budget fallback " + repr(fallback))
+        self.budget = {
+            "max_bytes": max_bytes,
+            "max_seconds": max_seconds,
+            "fallback": fallback
+        }
+
+    def estimate_cost(self, recursion_depth=None, mode="numpy",
+                      tolerance=None, view_scale=1.0):
+        """
+        Return the CostEstimate (exact number of points and estimated
+        peak bytes as ints, estimated seconds as a float, inf if too
+        large) of generating the curve of recursion_depth with mode, one
+        of the keys of COST_MODELS
+
+        If tolerance is given when streaming, the parts spanning less
+        than tolerance at view_scale are chords (see iter_points) and
+        the points are bounded by AffineRules.detail_size instead
+        """
+        if recursion_depth is None:
+            recursion_depth = self.recursion_depth
+        n_rules = len(self.rules)
+        n_points_rules = sum(
+            1 for rule in self.rules
+            if rule[2] is None and rule[3] is None)  # c type rules
+        n_points = n_rules + 1
+        for _ in range(recursion_depth - 1):
+            n_points = (n_rules - n_points_rules) * n_points + n_points_rules
+        if not self.rules:
+            n_points = 1  # the start point
+        if tolerance is not None and mode == "stream" and self.rules:
+            affine_rules = self.compiled_rules()
+            n_points = min(n_points, affine_rules.detail_size(
+                recursion_depth, view_scale, tolerance, min(
+                    recursion_depth,
+                    affine_rules.leaf_level(CULLED_LEAF_POINTS))))
+        bytes_per_point, points_per_second = COST_MODELS[mode]
+        if mode == "numpy":
+            # the result, cached level and temporaries are of self.dtype
+            bytes_per_point = bytes_per_point * \
+                np.dtype(self.dtype).itemsize // 8
+        elif mode == "stream":
+            n_bytes = min(n_points, DEFAULT_CHUNK_SIZE) * 2 * \
+                np.dtype(self.dtype).itemsize
+            return CostEstimate(n_points, n_bytes,
+                                count_seconds(n_points, points_per_second))
+        return CostEstimate(n_points, n_points * bytes_per_point,
+                            count_seconds(n_points, points_per_second))
+
+    def check_budget(self, recursion_depth=None, mode="numpy",
+                     tolerance=None, view_scale=1.0):
+        """
+        Return the mode to generate the curve of recursion_depth with
+        within the budget: mode itself, or "stream" if mode exceeds the
+        memory budget and the fallback is to stream, streamed curves
+        being pruned within tolerance at view_scale if given (see
+        estimate_cost)
+        raises BudgetExceededError if the curve can not be generated
+        within the budget
+        """
+        cost = self.estimate_cost(
+            recursion_depth, mode, tolerance, view_scale)
+        max_bytes = self.budget["max_bytes"]
+        max_seconds = self.budget["max_seconds"]
+        if max_bytes is not None and cost.bytes > max_bytes:
+            if self.budget["fallback"] != "stream":
+                raise BudgetExceededError(
+                    "Curve of {} points needs about {} MB".format(
+                        format_count(cost.points),
+                        format_count(cost.bytes // 2**20)))
+            mode = "stream"
+            cost = self.estimate_cost(
+                recursion_depth, mode, tolerance, view_scale)
+        if max_seconds is not None and cost.seconds > max_seconds:
+            raise BudgetExceededError(
+                "Curve of {} points needs about {:.3g} seconds".format(
+                    format_count(cost.points), cost.seconds))
+        return mode
+
+    def require_budget(self, recursion_depth=None, mode="numpy"):
+        """
+        Check that the curve of recursion_depth can be held in memory
+        generated with mode within the budget
+        raises BudgetExceededError otherwise
+        """
+        if self.check_budget(recursion_depth, mode) != mode:
+            raise BudgetExceededError(
+                "Curve exceeds the memory budget, stream it with iter_points")
+
     def reflection(self, line, point):
         """
         find the reflection in line ax + by + c = 0 represented as (a,b,c)
@@ -152,17 +344,39 @@ class FastFractal():
                 last_y + self.base_length * scale_fac * sin(theta)))
         return curve
 
-    def fractal_curve(self, recursion_depth=None):
+    def fractal_curve(self, recursion_depth=None, engine=None, workers=None):
         """
         Form a recursive curve from rules of recursion_depth
+
+        engine selects the implementation ("python" or "numpy"), by
+        default self.engine; both return the same list of points
+        workers > 1 generates the numpy curve on that many processes
+        """
+        if engine is None:
+            engine = self.engine
+        with RECORDER.phase("fractal_curve." + engine) as phase:
+            if engine == "numpy":
+                self.require_budget(recursion_depth, "list")
+                curve = list(map(tuple, self.fractal_array(
+                    recursion_depth, workers).tolist()))
+            else:
+                curve = self.python_curve(recursion_depth)
+            phase.add_points(len(curve))
+        return curve
+
+    def python_curve(self, recursion_depth=None):
+        """
+        Form a recursive curve from rules of recursion_depth as a list of
+        points by transforming the lists of points of the lower levels
         """
         if not self.rules:
             return [self.start_point]
         if recursion_depth is None:
             recursion_depth = self.recursion_depth
+        self.require_budget(recursion_depth, "python")
         if recursion_depth == 1:
             return self.form_base_curve()
-        curve_prev_level = self.fractal_curve(recursion_depth - 1)
+        curve_prev_level = self.python_curve(recursion_depth - 1)
         last_point = curve_prev_level[0]
         curve = []
         for theta, scale_fac, is_flipped, is_reversed in self.rules:
@@ -187,57 +401,686 @@ class FastFractal():
             last_point = sub_crv[-1]
         return curve
 
+    def compiled_rules(self):
+        """
+        Return the rules compiled into affine maps (AffineRules), compiled
+        once and reused as long as rules and base_length are unchanged
+        """
+        key = (tuple(map(tuple, self.rules)), self.base_length)
+        if self.affine_rules is None or self.affine_rules[0] != key:
+            self.affine_rules = (
+                key, AffineRules(self.rules, self.base_length))
+        return self.affine_rules[1]
+
+    def compiled_normalized_rules(self):
+        """
+        Return (rules_key, AffineRules) of the rules compiled for a unit
+        base length, the frame in which curves are cached
+        """
+        key = rules_key(self.rules)
+        if self.normalized_rules is None or self.normalized_rules[0] != key:
+            self.normalized_rules = (key, AffineRules(self.rules, 1.0))
+        return self.normalized_rules
+
+    def normalized_key(self):
+        """
+        Return the key of the normalized curves of the rules in self.dtype
+        in the geometry and disk caches
+        """
+        key, _ = self.compiled_normalized_rules()
+        if self.dtype != np.float64:
+            key += "-" + np.dtype(self.dtype).name
+        return key
+
+    def set_cache_budget(self, max_bytes):
+        """
+        Set the maximum bytes of curves held by the geometry cache
+        """
+        self.cache.set_max_bytes(max_bytes)
+
+    def set_disk_cache(self, directory=None,
+                       max_bytes=DEFAULT_DISK_CACHE_BYTES):
+        """
+        Keep the generated curves in a persistent cache in directory (see
+        cache.DiskCache, default per user directory if None) holding at
+        most max_bytes, or in memory only if max_bytes is 0
+        """
+        self.disk_cache = DiskCache(directory, max_bytes) if max_bytes \
+            else None
+
+    def cached_normalized_curve(self, recursion_depth):
+        """
+        Return the normalized curve of recursion_depth (see
+        normalized_curve) if cached in memory or on disk, otherwise None
+        """
+        key = self.normalized_key()
+        curve = self.cache.get(key, recursion_depth)
+        if curve is None and self.disk_cache is not None:
+            curve = self.disk_cache.get(key, recursion_depth)
+        return curve
+
+    def normalized_curve(self, recursion_depth, workers=None):
+        """
+        Return the curve of recursion_depth for a unit base length relative
+        to its first point, from the geometry cache or the disk cache
+        (memory mapped) if possible
+
+        On a miss the curve is generated by workers processes if more than
+        one, otherwise built from the highest cached level below it
+        (composing the maps from recursion_depth down to that level),
+        and stored in the caches
+        """
+        _, affine_rules = self.compiled_normalized_rules()
+        key = self.normalized_key()
+        curve = self.cached_normalized_curve(recursion_depth)
+        if curve is not None:
+            return curve
+        cached_level, cached_curve = self.cache.nearest(key, recursion_depth)
+        if workers and workers > 1:
+            curve = parallel_relative_curve(
+                affine_rules, recursion_depth, workers).astype(
+                    self.dtype, copy=False)
+        elif cached_level is None:
+            curve = affine_rules.relative_curve(recursion_depth, self.dtype)
+        else:
+            curve = affine_rules.apply(
+                affine_rules.compose(recursion_depth, cached_level),
+                cached_curve, np.empty(
+                    (affine_rules.curve_size(recursion_depth), 2),
+                    dtype=self.dtype))
+        if self.disk_cache is not None:
+            self.disk_cache.put(key, recursion_depth, curve)
+        self.cache.put(key, recursion_depth, curve)
+        return curve
+
+    def fractal_array(self, recursion_depth=None, workers=None):
+        """
+        Vectorized counterpart of fractal_curve returning the points
+        as an (N, 2) numpy array of self.dtype, generated by workers
+        processes if more than one
+
+        The affine maps of the rules are precomposed down to the base
+        curve and applied to it once (see AffineRules), the result is
+        cached in a normalized frame and scaled by base_length and
+        moved to start_point here
+        """
+        if not self.rules:
+            return np.array([self.start_point], dtype=self.dtype)
+        if recursion_depth is None:
+            recursion_depth = self.recursion_depth
+        self.require_budget(recursion_depth, "numpy")
+        _, affine_rules = self.compiled_normalized_rules()
+        origin_x, origin_y = affine_rules.origin(recursion_depth)
+        curve = np.multiply(
+            self.normalized_curve(recursion_depth, workers), self.base_length,
+            dtype=self.dtype)
+        curve += (self.start_point[0] + origin_x * self.base_length,
+                  self.start_point[1] + origin_y * self.base_length)
+        return curve
+
+    def iter_points(self, recursion_depth=None, chunk_size=None,
+                    viewport=None, tolerance=None, view_scale=1.0,
+                    progress=None):
+        """
+        Lazily generate the points of the curve of recursion_depth
+
+        Yields (x, y) tuples if chunk_size is None, otherwise (n, 2) arrays
+        of self.dtype of chunk_size points (the last one possibly smaller).
+        The rule tree is walked depth first (see AffineRules.iter_chunks)
+        so that memory used is O(recursion_depth) besides a chunk.
+        With a viewport (x_min, y_min, x_max, y_max) the parts of the curve
+        certainly outside of it are replaced by straight segments, as are
+        with a tolerance the parts spanning less than tolerance once
+        scaled by view_scale (e.g. less than a pixel on screen).
+        progress(fraction) is called with the fraction of the curve walked
+        through as it is generated. Without viewport nor tolerance a curve
+        in the geometry or disk cache is streamed from there instead
+        """
+        if recursion_depth is None:
+            recursion_depth = self.recursion_depth
+        cached_curve = None
+        if self.rules and viewport is None and tolerance is None and \
+                self.out_of_core is None:
+            cached_curve = self.cached_normalized_curve(recursion_depth)
+            # with a disk cache, generate a whole curve fitting in the
+            # geometry cache once so that later runs stream it from disk
+            if cached_curve is None and self.disk_cache is not None and \
+                    self.estimate_cost(recursion_depth).bytes <= \
+                    self.cache.max_bytes:
+                cached_curve = self.normalized_curve(recursion_depth)
+        if not self.rules:
+            chunks = [np.array([self.start_point], dtype=self.dtype)]
+        elif self.out_of_core is not None and viewport is None and \
+                tolerance is None:
+            chunks = self.transformed_chunks(self.out_of_core_chunks(
+                recursion_depth,
+                chunk_size if chunk_size else DEFAULT_CHUNK_SIZE, progress),
+                recursion_depth)
+        elif cached_curve is not None:
+            chunks = self.transformed_chunks(split_curve(
+                cached_curve,
+                chunk_size if chunk_size else DEFAULT_CHUNK_SIZE, progress),
+                recursion_depth)
+        else:
+            chunks = self.compiled_rules().iter_chunks(
+                recursion_depth, self.start_point,
+                chunk_size if chunk_size else DEFAULT_CHUNK_SIZE, self.dtype,
+                viewport, tolerance, view_scale, progress)
+        if chunk_size:
+            yield from chunks
+        else:
+            for chunk in chunks:
+                yield from map(tuple, chunk.tolist())
+
+    def transformed_chunks(self, chunks, recursion_depth):
+        """
+        Yield the chunks of the normalized curve of recursion_depth (e.g.
+        memory mapped from the disk cache) scaled by base_length and
+        moved to start_point as arrays of self.dtype
+        """
+        _, affine_rules = self.compiled_normalized_rules()
+        origin_x, origin_y = affine_rules.origin(recursion_depth)
+        offset = (self.start_point[0] + origin_x * self.base_length,
+                  self.start_point[1] + origin_y * self.base_length)
+        for chunk in chunks:
+            chunk = np.multiply(chunk, self.base_length, dtype=self.dtype)
+            chunk += offset
+            yield chunk
+
+    def set_out_of_core(self, directory=None):
+        """
+        Generate the curves streamed whole (without viewport nor
+        tolerance, see iter_points) and exported into .npy files of
+        directory, then read back in chunks, so that curves larger than
+        memory are handled with flat memory use, or in memory if
+        directory is None
+        """
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.out_of_core = directory
+
+    def out_of_core_file(self, recursion_depth=None, progress=None):
+        """
+        Return the .npy file of the out of core directory (see
+        set_out_of_core) holding the normalized curve of recursion_depth
+        (see normalized_curve), generated depth first into it if missing
+        (see outofcore.write_npy), progress(fraction) is called as it is
+        generated
+        """
+        if recursion_depth is None:
+            recursion_depth = self.recursion_depth
+        _, affine_rules = self.compiled_normalized_rules()
+        filename = os.path.join(self.out_of_core, "{}_{}_{}.npy".format(
+            self.normalized_key(), recursion_depth, GEOMETRY_VERSION))
+        if not os.path.exists(filename):
+            origin_x, origin_y = affine_rules.origin(recursion_depth)
+            with RECORDER.phase("out_of_core.generate") as phase:
+                n_points = affine_rules.curve_size(recursion_depth)
+                outofcore.write_npy(filename, affine_rules.iter_chunks(
+                    recursion_depth, (-origin_x, -origin_y),
+                    DEFAULT_CHUNK_SIZE, self.dtype, progress=progress),
+                    n_points, self.dtype)
+                phase.add_points(n_points)
+        return filename
+
+    def out_of_core_chunks(self, recursion_depth, chunk_size, progress=None):
+        """
+        Yield the normalized curve of recursion_depth from its out of core
+        file in chunks of chunk_size points, progress(fraction) covering
+        its generation if needed then its reading
+        """
+        generated = [False]
+
+        def generation_progress(fraction):
+            """
+            Report the generation as the first half of the progress
+            """
+            generated[0] = True
+            if progress is not None:
+                progress(fraction / 2)
+
+        filename = self.out_of_core_file(recursion_depth, generation_progress)
+        n_points = outofcore.npy_points(filename)
+        n_read = 0
+        for chunk in outofcore.iter_npy(filename, chunk_size):
+            n_read += len(chunk)
+            if progress is not None:
+                fraction = n_read / n_points
+                progress(0.5 + fraction / 2 if generated[0] else fraction)
+            yield chunk
+
+    def auto_depth(self, view_size, tolerance=1.0, max_depth=20):
+        """
+        Return the recursion depth (at most max_depth) beyond which the
+        copies of the base curve would span less than tolerance when the
+        whole curve is displayed over view_size, e.g. the zoomed size in
+        pixels of the curve on the canvas with a tolerance of a pixel
+        """
+        if not self.rules:
+            return 1
+        return self.compiled_rules().auto_level(
+            view_size, tolerance, max_depth)
+
+    def convex_hull(self, recursion_depth=None):
+        """
+        Return the convex hull of the curve of recursion_depth as an (H, 2)
+        array of vertices in counter clockwise order, computed from the
+        hulls of the lower levels without generating the curve
+        """
+        if recursion_depth is None:
+            recursion_depth = self.recursion_depth
+        if not self.rules:
+            return np.array([self.start_point], dtype=np.float64)
+        affine_rules = self.compiled_rules()
+        origin_x, origin_y = affine_rules.origin(recursion_depth)
+        return affine_rules.hull(recursion_depth) + (
+            self.start_point[0] + origin_x, self.start_point[1] + origin_y)
+
+    def bounding_box(self, recursion_depth=None):
+        """
+        Return the bounding box (x_min, y_min, x_max, y_max) of the curve
+        of recursion_depth, see convex_hull
+        """
+        hull = self.convex_hull(recursion_depth)
+        (x_min, y_min), (x_max, y_max) = hull.min(axis=0), hull.max(axis=0)
+        return float(x_min), float(y_min), float(x_max), float(y_max)
+
+    def attractor_circle(self, recursion_depth=None):
+        """
+        Return a disk ((x, y), radius) holding the curve of recursion_depth
+        derived from the depth independent bound of the rules (see
+        AffineRules.attractor_bound), None if the rules have no such bound
+        """
+        if recursion_depth is None:
+            recursion_depth = self.recursion_depth
+        if not self.rules:
+            return None
+        affine_rules = self.compiled_rules()
+        bound = affine_rules.attractor_bound()
+        if bound is None:
+            return None
+        (center_x, center_y), radius = bound
+        chord = complex(*affine_rules.chord(recursion_depth))
+        origin_x, origin_y = affine_rules.origin(recursion_depth)
+        center = chord * complex(center_x, center_y)
+        return ((self.start_point[0] + origin_x + center.real,
+                 self.start_point[1] + origin_y + center.imag),
+                abs(chord) * radius)
+
+    def points_at(self, recursion_depth, indices):
+        """
+        Return the points at indices (sequence of ints, negative ones
+        counting from the end) of the curve of recursion_depth as an
+        (n, 2) float64 array, in O(recursion_depth) per point
+        """
+        if not self.rules:
+            indices = np.array(indices, dtype=np.int64).reshape(-1)
+            if ((indices != 0) & (indices != -1)).any():
+                raise IndexError("Point index out of range")
+            return np.repeat(
+                np.array([self.start_point], dtype=np.float64),
+                len(indices), axis=0)
+        return self.compiled_rules().locate(
+            recursion_depth, indices, self.start_point)
+
+    def point_at(self, recursion_depth, index):
+        """
+        Return the point (x, y) at index of the curve of recursion_depth
+        """
+        return tuple(self.points_at(recursion_depth, [index])[0].tolist())
+
     def remove_repeated_points(self, curve):
         """
-        removes the repeated points in the curve
+        removes the repeated points in the curve, given as an (N, 2)
+        array (or a sequence of points), returned as an array
         """
-        new_curve = [curve[0]]
-        last_point = curve[0]
-        for next_point in curve[1:]:
-            if next_point != last_point:
-                new_curve.append(next_point)
-            last_point = next_point
-        return new_curve
+        return postprocess.remove_repeated_points(curve)
 
-    def round_corners(self, curve):
+    def round_corners(self, curve, iterations=1):
         """
-        Return the curve with rounded corners
+        Return the curve (an (N, 2) array) with rounded corners
 
         Replaces two points with their midpoint while retaining the
-        start and end points
-        """
-        round_weight = 3
-        rounded_curve = [curve[0]]  # retain the first point
-        current_point = curve[0]
-        for next_point in curve[1:]:
-            mid_point = (
-                (current_point[0] + next_point[0] * round_weight) / (1 + round_weight),
-                (current_point[1] + next_point[1] * round_weight) / (1 + round_weight))
-            rounded_curve.append(mid_point)
-            current_point = next_point
-            round_weight = 1 / round_weight
-        rounded_curve.append(curve[-1])  # retain the last point
-        return rounded_curve
+        start and end points, see postprocess.round_corners
+        """
+        return postprocess.round_corners(curve, iterations)
 
     def draw_fractal(
             self,
             recursion_depth=None,
             round_corners=False,
-            fill_color=False):
+            fill_color=False,
+            viewport=None,
+            tolerance=None,
+            view_scale=1.0,
+            simplify_tolerance=DRAW_TOLERANCE,
+            on_progress=None,
+            view_offset=(0.0, 0.0)):
         """
         Draw the fractal curve on the canvas of the parent class
+
+        The curve is generated on a background thread and drawn from the
+        mainloop (see draw_in_background), a drawing in progress is
+        superseded, on_progress(fraction) is called as it advances.
+        A point p of the curve is drawn at p * view_scale + view_offset
+        on the canvas. viewport (x_min, y_min, x_max, y_max), in curve
+        coordinates, limits the detail drawn to the visible region of the
+        canvas for lines, tolerance stops the recursion of parts spanning
+        less than tolerance pixels at the view_scale zoom and the lines
+        are simplified within simplify_tolerance pixels (None to draw
+        every point)
+        raises BudgetExceededError if the curve exceeds the budget, filled
+        curves over the memory budget are drawn as lines if the budget
+        falls back to streaming
         """
-        if recursion_depth:
-            curve_to_draw = self.fractal_curve(recursion_depth)
-        else:
-            curve_to_draw = self.fractal_curve(self.recursion_depth)
-        if len(curve_to_draw) > 1:  # draw only if there are more than one points
+        if not recursion_depth:
+            recursion_depth = self.recursion_depth
+        if fill_color and \
+                self.check_budget(recursion_depth, "numpy") == "stream":
+            fill_color = False  # a filled polygon can not be streamed
+        if not fill_color:
+            if viewport is None:
+                # culled to a viewport the walk costs about the visible
+                # detail, which the whole curve does not bound
+                self.check_budget(
+                    recursion_depth, "stream", tolerance, view_scale)
+            # lines are drawn chunk by chunk from the point stream dropping
+            # repeated points and, unless the corners are rounded (whose
+            # look depends on every point), collinear runs, the rounded
+            # curve being simplified afterwards
+            post_processor = postprocess.PostProcessor(
+                merge_collinear=not round_corners,
+                round_iterations=int(round_corners),
+                simplify_tolerance=simplify_tolerance and
+                simplify_tolerance / view_scale)
+            self.draw_in_background(
+                lambda progress: view_transformed(RECORDER.timed(
+                    "draw.postprocess", self.post_processed(RECORDER.timed(
+                        "draw.generate", self.iter_points(
+                            recursion_depth, DEFAULT_CHUNK_SIZE, viewport,
+                            tolerance, view_scale, progress)),
+                        post_processor)), view_scale, view_offset),
+                self.chunk_drawer(), on_progress)
+            return
+
+        def filled_curve(progress):
+            """
+            Generate the whole curve to fill as a single item
+            """
+            with RECORDER.phase("draw.generate") as phase:
+                curve = self.fractal_array(recursion_depth)
+                phase.add_points(len(curve))
             if round_corners:
-                curve_to_draw = self.round_corners(
-                    self.remove_repeated_points(curve_to_draw))
-            if fill_color:
-                self.parent.canvas.create_polygon(curve_to_draw, fill="black")
-            else:
-                self.parent.canvas.create_line(curve_to_draw)
+                with RECORDER.phase("draw.postprocess", len(curve)):
+                    curve = self.round_corners(
+                        self.remove_repeated_points(curve))
+            progress(1.0)
+            yield from view_transformed([curve], view_scale, view_offset)
+
+        def draw_polygon(curve):
+            """
+            Fill the curve, drawn only if there are more than one points
+            """
+            if len(curve) < 2:
+                return False
+            with RECORDER.phase("draw.tcl", len(curve)):
+                coordinates = curve.ravel().tolist()
+            with RECORDER.phase("draw.tk", len(curve)):
+                self.parent.canvas.create_polygon(coordinates, fill="black")
+            return True
+
+        self.draw_in_background(filled_curve, draw_polygon, on_progress)
+
+    def export_points(self, recursion_depth=None, round_corners=False,
+                      tolerance=None, view_scale=1.0,
+                      simplify_tolerance=None):
+        """
+        Return the stream of chunks of the fractal curve to export,
+        without repeated points and collinear runs unless the corners are
+        rounded, parts spanning less than tolerance (at view_scale) being
+        straight segments and simplified within simplify_tolerance if
+        given (see iter_points and postprocess.PostProcessor). Out of core
+        (see set_out_of_core) the whole curve is read from its file,
+        tolerance is then ignored
+        raises BudgetExceededError if the curve exceeds the budget
+        """
+        if not recursion_depth:
+            recursion_depth = self.recursion_depth
+        if self.out_of_core is not None:
+            tolerance = None
+        self.check_budget(recursion_depth, "stream", tolerance, view_scale)
+        return RECORDER.timed("export.postprocess", self.post_processed(
+            RECORDER.timed("export.generate", self.iter_points(
+                recursion_depth, DEFAULT_CHUNK_SIZE,
+                tolerance=tolerance, view_scale=view_scale)),
+            postprocess.PostProcessor(
+                merge_collinear=not round_corners,
+                round_iterations=int(round_corners),
+                simplify_tolerance=simplify_tolerance)))
+
+    def rasterize(
+            self,
+            recursion_depth=None,
+            width=1000,
+            height=1000,
+            dpi=raster.DEFAULT_DPI,
+            line_width=raster.DEFAULT_LINE_WIDTH,
+            fill_rule=None,
+            round_corners=False,
+            tolerance=EXPORT_TOLERANCE):
+        """
+        Return a Rasterizer (see raster) with the fractal curve fitted into
+        width x height pixels, drawn as lines of line_width points or
+        filled with fill_rule (one of raster.FILL_RULES) if given
+
+        The curve is streamed, parts spanning less than tolerance pixels
+        being drawn as straight segments
+        raises BudgetExceededError if the curve exceeds the budget
+        """
+        if not recursion_depth:
+            recursion_depth = self.recursion_depth
+        rasterizer = raster.Rasterizer(width, height, dpi, line_width)
+        view_scale = rasterizer.fit(self.bounding_box(recursion_depth))
+        chunks = self.export_points(
+            recursion_depth, round_corners, tolerance, view_scale)
+        if fill_rule:
+            rasterizer.fill(chunks, fill_rule)
         else:
-            self.parent.canvas.bell()  # ring bell to indicate wrong action
+            rasterizer.draw_lines(chunks)
+        return rasterizer
+
+    def save_png(self, filename, recursion_depth=None, **options):
+        """
+        Save the fractal curve as a png image without a canvas, options
+        are those of rasterize
+        """
+        self.rasterize(recursion_depth, **options).save(filename, "PNG")
+
+    def save_svg(
+            self,
+            filename,
+            recursion_depth=None,
+            precision=svg.DEFAULT_PRECISION,
+            relative=True,
+            stroke_width=svg.DEFAULT_STROKE_WIDTH,
+            fill_rule=None,
+            round_corners=False,
+            simplify_tolerance=None,
+            compress=None):
+        """
+        Save the fractal curve as an svg file without a canvas, streaming
+        the points into a single path (see svg.save_svg) with coordinates
+        of precision decimals, parts spanning less than the precision
+        are written as straight segments
+        raises BudgetExceededError if the curve exceeds the budget
+        """
+        if not recursion_depth:
+            recursion_depth = self.recursion_depth
+        svg.save_svg(
+            filename,
+            self.export_points(recursion_depth, round_corners,
+                               10.0**-precision, 1.0, simplify_tolerance),
+            self.bounding_box(recursion_depth), compress,
+            precision=precision, relative=relative,
+            stroke_width=stroke_width, fill_rule=fill_rule)
+
+    def save_postscript(
+            self,
+            filename,
+            recursion_depth=None,
+            precision=postscript.DEFAULT_PRECISION,
+            line_width=postscript.DEFAULT_LINE_WIDTH,
+            fill_rule=None,
+            round_corners=False,
+            simplify_tolerance=None,
+            encapsulated=None):
+        """
+        Save the fractal curve as a postscript file without a canvas,
+        streaming the points as path operations (see
+        postscript.save_postscript) with coordinates of precision
+        decimals, parts spanning less than the precision are written as
+        straight segments
+        raises BudgetExceededError if the curve exceeds the budget
+        """
+        if not recursion_depth:
+            recursion_depth = self.recursion_depth
+        postscript.save_postscript(
+            filename,
+            self.export_points(recursion_depth, round_corners,
+                               10.0**-precision, 1.0, simplify_tolerance),
+            self.bounding_box(recursion_depth), encapsulated,
+            precision=precision, line_width=line_width, fill_rule=fill_rule)
+
+    @staticmethod
+    def post_processed(chunks, post_processor):
+        """
+        Pass a stream of chunks of a curve through post_processor
+        """
+        for chunk in chunks:
+            yield post_processor.feed(chunk)
+        yield post_processor.flush()
+
+    def chunk_drawer(self):
+        """
+        Return a function drawing a curve given as a stream of (n, 2) point
+        arrays on the canvas of the parent class, one line per chunk, each
+        line starting at the last point of the previous one
+        """
+        state = {"last_point": None}
+
+        def draw_chunk(chunk):
+            """
+            Draw the next chunk, return True if a line was drawn
+            """
+            if state["last_point"] is not None:
+                chunk = np.concatenate((state["last_point"], chunk))
+            if len(chunk):
+                state["last_point"] = chunk[-1:]
+            if len(chunk) < 2:
+                return False
+            with RECORDER.phase("draw.tcl", len(chunk)):
+                coordinates = chunk.ravel().tolist()
+            with RECORDER.phase("draw.tk", len(chunk)):
+                self.parent.canvas.create_line(coordinates)
+            return True
+
+        return draw_chunk
+
+    def draw_in_background(self, generate, draw_item, on_progress=None,
+                           frame_seconds=DRAW_FRAME_SECONDS):
+        """
+        Generate items on a background thread (see worker.Worker) and draw
+        them with draw_item(item), returning True if something was drawn,
+        on the canvas of the parent class
+
+        The items are taken from the mainloop for at most frame_seconds
+        per frame, keeping the window responsive, on_progress(fraction)
+        is called after each frame, a drawing in progress is cancelled
+        first
+        """
+        self.cancel_drawing()
+        worker = Worker(generate)
+        state = {"is_drawn": False}
+
+        def draw_frame():
+            """
+            Draw the items ready in one frame and schedule the next frame
+            """
+            frame_end = perf_counter() + frame_seconds
+            delay = DRAW_FRAME_DELAY
+            try:
+                while perf_counter() < frame_end:
+                    state["is_drawn"] = draw_item(worker.get()) or \
+                        state["is_drawn"]
+            except queue.Empty:
+                delay = DRAW_POLL_DELAY  # wait for the worker
+            except StopIteration:
+                self.draw_job = None
+                if RECORDER.enabled:  # time the display of the drawing
+                    with RECORDER.phase("draw.render"):
+                        self.parent.canvas.update_idletasks()
+                if on_progress is not None:
+                    on_progress(1.0)
+                if not state["is_drawn"]:
+                    self.parent.canvas.bell()  # ring bell for wrong action
+                return
+            except Exception:
+                self.draw_job = None
+                raise
+            if on_progress is not None:
+                on_progress(worker.progress)
+            self.draw_job = (
+                worker, self.parent.canvas.after(delay, draw_frame))
+
+        self.draw_job = (worker, self.parent.canvas.after_idle(draw_frame))
+
+    def cancel_drawing(self):
+        """
+        Stop the drawing in progress on the canvas and its generation, the
+        lines already drawn are kept, return True if a drawing was cancelled
+        """
+        if self.draw_job is None:
+            return False
+        worker, job = self.draw_job
+        worker.cancel()
+        self.parent.canvas.after_cancel(job)
+        self.draw_job = None
+        return True
+
+
+def view_transformed(chunks, view_scale=1.0, view_offset=(0.0, 0.0)):
+    """
+    Yield the chunks of a curve mapped to the view, a point p becoming
+    p * view_scale + view_offset
+    """
+    if view_scale == 1.0 and tuple(view_offset) == (0.0, 0.0):
+        yield from chunks
+        return
+    for chunk in chunks:
+        chunk = np.multiply(chunk, view_scale, dtype=np.float64)
+        chunk += view_offset
+        yield chunk
+
+
+def split_curve(curve, chunk_size, progress=None):
+    """
+    Yield the curve (array) in chunks of chunk_size points, calling
+    progress(fraction) with the fraction of the curve yielded
+    """
+    for start in range(0, len(curve), chunk_size):
+        if progress is not None:
+            progress(min(start + chunk_size, len(curve)) / len(curve))
+        yield curve[start:start + chunk_size]
+
+
+def load_fractal(path):
+    """
+    Return a FastFractal without a parent (headless) holding the curve of
+    the json file path
+    """
+    fractal = FastFractal(None)
+    fractal.curve.load_from_file(path)
+    if fractal.curve.rules is None:
+        raise ValueError("Malformed curve file {}".format(path))
+    fractal.curve.set_parent_parameters()
+    return fractal
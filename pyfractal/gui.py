@@ -1,14 +1,22 @@
 """Main Class for handling GUI of the application"""
 
-import io
-from tkinter import Tk, Frame, Canvas, Scrollbar, Menu, ttk
+from tkinter import Tk, Frame, Canvas, Scrollbar, Menu, ttk, Label, \
+    Checkbutton
 from tkinter import HORIZONTAL, VERTICAL, BOTH, LEFT, RIGHT, \
-    X, Y, BOTTOM, StringVar
-from PIL import Image
+    X, Y, BOTTOM, W, StringVar, BooleanVar
 from pkg_resources import resource_listdir
 import canvasvg
-from .fastfractal import FastFractal
+from .fastfractal import FastFractal, BudgetExceededError
 from .parameters import Parameters
+from .instrument import RECORDER
+
+DRAW_BUDGET_BYTES = 2**31  # memory budget of fractals drawn on the canvas
+DRAW_BUDGET_SECONDS = 120  # time budget of fractals drawn on the canvas
+STATUS_INTERVAL = 500  # milliseconds between updates of the status bar
+ZOOM_FACTOR = 1.1  # zoom of a wheel step
+ZOOM_SETTLE_DELAY = 150  # milliseconds without zooming before redrawing
+VIEW_TOLERANCE = 0.5  # pixels, parts of the curve spanning less are lines
+VIEW_MARGIN = 0.5  # fraction of the window drawn beyond each side
 
 
 def todo():
@@ -43,6 +51,20 @@ class GUI():
             "class": None,
             "variable": None
         }
+        self.view = {
+            "scale": 1.0,  # a point p of a curve is drawn at
+            "offset": (0.0, 0.0),  # p * scale + offset on the canvas
+            "drawings": [],  # (fractal, arguments of draw_fractal) drawn
+            "region": None,  # canvas region drawn in detail
+            "settle_job": None  # id of the redraw after zooming
+        }
+        self.status_bar = {
+            "frame": None,
+            "label": None,
+            "stats": None,
+            "profile": None
+        }
+        self.init_status_bar()
         self.init_canvas_frame()
         self.init_parameters_frame()
         # self.init_menu_bar()
@@ -50,6 +72,12 @@ class GUI():
             "parameters": Parameters(self),
             "fractal": FastFractal(self)
         }
+        self.classes["fractal"].set_budget(
+            max_bytes=DRAW_BUDGET_BYTES, max_seconds=DRAW_BUDGET_SECONDS)
+        try:
+            self.classes["fractal"].set_disk_cache()
+        except OSError:  # no writable cache directory, memory only
+            pass
         self.init_parameter_combobox()
 
     def init_canvas_frame(self, max_width=4000, max_height=4000):
@@ -78,11 +106,64 @@ class GUI():
 
         self.canvas.bind("<ButtonPress-1>", self.move_start)
         self.canvas.bind("<B1-Motion>", self.move_move)
+        self.canvas.bind("<ButtonRelease-1>", self.move_end)
         self.canvas.bind("<Button-4>", self.linux_zoomer_plus)
         self.canvas.bind("<Button-5>", self.linux_zoomer_minus)
         # windows scroll
         self.canvas.bind("<MouseWheel>", self.windows_zoomer)
 
+    def init_status_bar(self):
+        """
+        Creates the status bar at the bottom of the window, with toggles to
+        record the time, points and memory of the phases of drawing (shown
+        in the status bar) and to profile the GUI with cProfile
+        """
+        self.status_bar["frame"] = Frame(master=self.window)
+        self.status_bar["stats"] = BooleanVar(self.window)
+        self.status_bar["profile"] = BooleanVar(self.window)
+        Checkbutton(
+            self.status_bar["frame"], text="Stats",
+            var=self.status_bar["stats"],
+            command=self.toggle_stats).pack(side=LEFT)
+        Checkbutton(
+            self.status_bar["frame"], text="Profile",
+            var=self.status_bar["profile"],
+            command=self.toggle_profile).pack(side=LEFT)
+        self.status_bar["label"] = Label(
+            self.status_bar["frame"], text="", anchor=W)
+        self.status_bar["label"].pack(side=LEFT, fill=X, expand=True)
+        self.status_bar["frame"].pack(side=BOTTOM, fill=X)
+
+    def toggle_stats(self):
+        """
+        Start or stop recording the phases of drawing into the status bar
+        """
+        if self.status_bar["stats"].get():
+            RECORDER.reset()
+            RECORDER.enable()
+            self.update_status_bar()
+        else:
+            RECORDER.disable()
+
+    def update_status_bar(self):
+        """
+        Show the phases recorded last in the status bar while recording
+        """
+        if not RECORDER.enabled:
+            return
+        self.status_bar["label"].config(text=RECORDER.summary())
+        self.window.after(STATUS_INTERVAL, self.update_status_bar)
+
+    def toggle_profile(self):
+        """
+        Start profiling or stop and dump the profile, see instrument
+        """
+        if self.status_bar["profile"].get():
+            RECORDER.start_profile()
+        else:
+            self.status_bar["label"].config(
+                text="Profile saved to " + RECORDER.stop_profile())
+
     def move_start(self, event):
         """
         Mark the coordinates to start moving
@@ -95,29 +176,195 @@ class GUI():
         """
         self.canvas.scan_dragto(event.x, event.y, gain=1)
 
+    def move_end(self, event):
+        """
+        Redraw the curve if the region moved to was not drawn in detail
+        """
+        region = self.view["region"]
+        x_min, y_min, x_max, y_max = self.visible_region()
+        if region is not None and not (
+                region[0] <= x_min and region[1] <= y_min and
+                x_max <= region[2] and y_max <= region[3]):
+            self.settle_view()
+
     def windows_zoomer(self, event):
         """
         Zoomer functionality for windows
         """
         if event.delta > 0:
-            self.canvas.scale("all", event.x, event.y, 1.1, 1.1)
+            self.zoom(event, ZOOM_FACTOR)
         elif event.delta < 0:
-            self.canvas.scale("all", event.x, event.y, 0.9, 0.9)
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+            self.zoom(event, 1 / ZOOM_FACTOR)
 
     def linux_zoomer_plus(self, event):
         """
         Zoom into functionality linux
         """
-        self.canvas.scale("all", event.x, event.y, 1.1, 1.1)
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        self.zoom(event, ZOOM_FACTOR)
 
     def linux_zoomer_minus(self, event):
         """
         Zoom out functionality linux
         """
-        self.canvas.scale("all", event.x, event.y, 0.9, 0.9)
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        self.zoom(event, 1 / ZOOM_FACTOR)
+
+    def zoom(self, event, factor):
+        """
+        Zoom the view by factor around the pointer of event
+
+        Only the view transform changes, the curve is redrawn for the new
+        view once the wheel has been still for ZOOM_SETTLE_DELAY so that a
+        burst of wheel steps costs a single redraw
+        """
+        x_canvas = self.canvas.canvasx(event.x)
+        y_canvas = self.canvas.canvasy(event.y)
+        x_offset, y_offset = self.view["offset"]
+        self.view["scale"] *= factor
+        self.view["offset"] = (x_canvas - (x_canvas - x_offset) * factor,
+                               y_canvas - (y_canvas - y_offset) * factor)
+        self.settle_view()
+
+    def settle_view(self):
+        """
+        Redraw the curve after ZOOM_SETTLE_DELAY, postponing a pending
+        redraw
+        """
+        if self.view["settle_job"] is not None:
+            self.window.after_cancel(self.view["settle_job"])
+        self.view["settle_job"] = self.window.after(
+            ZOOM_SETTLE_DELAY, self.redraw_view)
+
+    def redraw_view(self):
+        """
+        Redraw the curves drawn on the canvas for the current view
+        """
+        self.view["settle_job"] = None
+        if not self.view["drawings"]:
+            return
+        self.cancel_drawing()
+        self.canvas.delete("all")
+        self.view["region"] = self.view_region()
+        for drawing in self.view["drawings"]:
+            try:
+                self.draw_view(*drawing)
+            except BudgetExceededError as error:
+                self.status_bar["label"].config(text=str(error))
+                self.window.bell()
+        self.update_scroll_region()
+
+    def visible_region(self):
+        """
+        Return the region (x_min, y_min, x_max, y_max) of the canvas
+        visible in the window
+        """
+        return (self.canvas.canvasx(0), self.canvas.canvasy(0),
+                self.canvas.canvasx(self.canvas.winfo_width()),
+                self.canvas.canvasy(self.canvas.winfo_height()))
+
+    def view_region(self):
+        """
+        Return the region of the canvas drawn in detail, the visible
+        region grown by VIEW_MARGIN on each side
+        """
+        x_min, y_min, x_max, y_max = self.visible_region()
+        x_margin = (x_max - x_min) * VIEW_MARGIN
+        y_margin = (y_max - y_min) * VIEW_MARGIN
+        return (x_min - x_margin, y_min - y_margin,
+                x_max + x_margin, y_max + y_margin)
+
+    def snapshot_fractal(self):
+        """
+        Return a FastFractal holding a copy of the curve of the current
+        parameters (rules, base length and start point) sharing the
+        caches and budget, so that the curve drawn is redrawn the same
+        whatever parameters are entered later
+        """
+        fractal = self.classes["fractal"]
+        snapshot = FastFractal(
+            self, [list(rule) for rule in fractal.rules],
+            tuple(fractal.start_point), fractal.base_length)
+        snapshot.recursion_depth = fractal.recursion_depth
+        snapshot.engine = fractal.engine
+        snapshot.dtype = fractal.dtype
+        snapshot.budget = dict(fractal.budget)
+        snapshot.cache = fractal.cache
+        snapshot.disk_cache = fractal.disk_cache
+        return snapshot
+
+    def draw_curve(self, recursion_depth, round_corners=False,
+                   fill_color=False, on_progress=None):
+        """
+        Draw the fractal curve of the current parameters (see
+        FastFractal.draw_fractal) over the curves already drawn, for the
+        current view, the curves are redrawn as the view is zoomed or
+        moved
+        raises BudgetExceededError if the curve exceeds the budget
+        """
+        drawing = (self.snapshot_fractal(), recursion_depth, round_corners,
+                   fill_color, on_progress)
+        if self.view["region"] is None:
+            self.view["region"] = self.view_region()
+        self.draw_view(*drawing)
+        self.view["drawings"].append(drawing)
+        self.update_scroll_region()
+
+    def cancel_drawing(self):
+        """
+        Stop the drawings in progress, the lines already drawn are kept,
+        return True if a drawing was cancelled
+        """
+        is_cancelled = False
+        for fractal, *_ in self.view["drawings"]:
+            is_cancelled = fractal.cancel_drawing() or is_cancelled
+        return is_cancelled
+
+    def clear_drawing(self):
+        """
+        Stop drawing and redrawing the curves and clear the canvas
+        """
+        self.cancel_drawing()
+        self.view["drawings"] = []
+        self.view["region"] = None
+        self.canvas.delete("all")
+
+    def draw_view(self, fractal, recursion_depth, round_corners=False,
+                  fill_color=False, on_progress=None):
+        """
+        Draw the curve of fractal for the current view
+
+        The region of the view (see view_region) is drawn in detail down
+        to VIEW_TOLERANCE pixels at the zoom of the view, the rest of the
+        curve coarsely, so that the points drawn are about those visible
+        whatever the zoom
+        raises BudgetExceededError if the curve exceeds the budget
+        """
+        scale = self.view["scale"]
+        x_offset, y_offset = self.view["offset"]
+        region = self.view["region"]
+        viewport = ((region[0] - x_offset) / scale,
+                    (region[1] - y_offset) / scale,
+                    (region[2] - x_offset) / scale,
+                    (region[3] - y_offset) / scale)
+        fractal.draw_fractal(
+            recursion_depth, round_corners, fill_color, viewport,
+            VIEW_TOLERANCE, scale, on_progress=on_progress,
+            view_offset=self.view["offset"])
+
+    def update_scroll_region(self):
+        """
+        Make the scroll region span the curves drawn and the window
+        """
+        scale = self.view["scale"]
+        x_offset, y_offset = self.view["offset"]
+        x_min, y_min, x_max, y_max = self.visible_region()
+        for fractal, recursion_depth, *_ in self.view["drawings"]:
+            curve_x_min, curve_y_min, curve_x_max, curve_y_max = \
+                fractal.bounding_box(recursion_depth)
+            x_min = min(curve_x_min * scale + x_offset, x_min)
+            y_min = min(curve_y_min * scale + y_offset, y_min)
+            x_max = max(curve_x_max * scale + x_offset, x_max)
+            y_max = max(curve_y_max * scale + y_offset, y_max)
+        self.canvas.configure(scrollregion=(x_min, y_min, x_max, y_max))
 
     def init_parameters_frame(self, height=400, width=200):
         """
@@ -218,22 +465,49 @@ class GUI():
         """
         Save the canvas as an svg
         """
-        canvasvg.saveall(filename, self.canvas)
+        with RECORDER.phase("save.canvas_svg"):
+            canvasvg.saveall(filename, self.canvas)
+
+    def save_svg(self, filename):
+        """
+        Save the fractal with the current parameters as svg (gzipped if
+        filename ends in .svgz), written without the canvas
+        """
+        parameters = self.classes["parameters"]
+        with RECORDER.phase("save.svg"):
+            self.classes["fractal"].save_svg(
+                filename, parameters.get_recursion_depth(),
+                fill_rule="evenodd" if parameters.vars["fill_color"].get()
+                else None,
+                round_corners=parameters.vars["round_corners"].get())
 
     def save_postscript(self, filename):
         """
-        Save canvas as postscript
+        Save the fractal with the current parameters as postscript
+        (encapsulated if filename ends in .eps), written without the canvas
         """
-        with open(filename, 'w') as savefile:
-            savefile.write(self.canvas.postscript())
+        parameters = self.classes["parameters"]
+        with RECORDER.phase("save.postscript"):
+            self.classes["fractal"].save_postscript(
+                filename, parameters.get_recursion_depth(),
+                fill_rule="evenodd" if parameters.vars["fill_color"].get()
+                else None,
+                round_corners=parameters.vars["round_corners"].get())
 
     def save_png(self, filename):
         """
-        Save canvas as png
-        """
-        post_script = self.canvas.postscript().encode()
-        img = Image.open(io.BytesIO(post_script))
-        img.save(filename, format="PNG")
+        Save the fractal with the current parameters as png, rendered
+        without the canvas at the size of the canvas
+        """
+        parameters = self.classes["parameters"]
+        with RECORDER.phase("save.png"):
+            self.classes["fractal"].save_png(
+                filename, parameters.get_recursion_depth(),
+                width=self.canvas.winfo_width(),
+                height=self.canvas.winfo_height(),
+                fill_rule="evenodd" if parameters.vars["fill_color"].get()
+                else None,
+                round_corners=parameters.vars["round_corners"].get())
 
     def run(self):
         """Function to run the mainloop of window of GUI class"""
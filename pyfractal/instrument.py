@@ -0,0 +1,317 @@
+"""Module to instrument the phases of generating and drawing curves"""
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from time import perf_counter
+
+PROFILE_FILE = "pyfractal.prof"  # default file of the cProfile dumps
+# peaks are measured per phase by resetting them, from python 3.9
+CAN_TRACE_PEAKS = hasattr(tracemalloc, "reset_peak")
+
+
+class PhaseStats():
+    """
+    Statistics of a phase over its calls: wall time (excluding the inner
+    phases), points handled and peak bytes allocated above the start of
+    a call (if memory is traced)
+    """
+
+    def __init__(self, name):
+        """
+        Initialize the statistics of a phase never entered
+        """
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.points = 0
+        self.peak_bytes = None
+
+    def as_dict(self):
+        """
+        Return the statistics as a dictionary
+        """
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "points": self.points,
+            "peak_bytes": self.peak_bytes
+        }
+
+    def __str__(self):
+        text = "{} {:.3f} s".format(self.name, self.seconds)
+        if self.points:
+            text += " {:,} pts".format(self.points)
+        if self.peak_bytes is not None:
+            text += " {:.1f} MB".format(self.peak_bytes / 2**20)
+        return text
+
+
+class NullPhase():
+    """
+    Phase recording nothing, used while the recorder is disabled
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add_points(self, n_points):
+        """
+        Ignore the points
+        """
+
+
+NULL_PHASE = NullPhase()
+
+
+class Phase():
+    """
+    Context manager timing a call of a phase of the recorder
+
+    The time of the inner phases (of the same thread) is not counted.
+    The allocated memory is traced for the whole process and its peak is
+    reset by every phase, so the peak of a call is only reported if no
+    phase of another thread started meanwhile (e.g. the generation on
+    the worker thread while the mainloop draws)
+    """
+
+    def __init__(self, recorder, name, points=0):
+        """
+        Initialize the call of phase name having handled points
+        """
+        self.recorder = recorder
+        self.name = name
+        self.points = points
+        self.start = None
+        self.start_bytes = None
+        self.foreign_resets = None  # peak resets of the other threads
+        self.peak = 0  # highest traced bytes seen by the inner phases
+        self.inner_seconds = 0.0
+
+    def add_points(self, n_points):
+        """
+        Count n_points more points handled by the call
+        """
+        self.points += n_points
+
+    def __enter__(self):
+        stack = self.recorder.stack()
+        if CAN_TRACE_PEAKS and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:  # the peak is reset, keep the one of the outer phase
+                stack[-1].peak = max(stack[-1].peak, peak)
+            self.recorder.reset_peak()
+            self.foreign_resets = self.recorder.foreign_resets()
+            self.start_bytes = current
+        stack.append(self)
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = perf_counter() - self.start
+        stack = self.recorder.stack()
+        stack.pop()
+        if stack:
+            stack[-1].inner_seconds += seconds
+        peak_bytes = None
+        if self.start_bytes is not None and tracemalloc.is_tracing():
+            peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            if self.recorder.foreign_resets() == self.foreign_resets:
+                peak_bytes = peak - self.start_bytes
+        self.recorder.record(self.name, seconds - self.inner_seconds,
+                             self.points, peak_bytes)
+        return False
+
+
+class Recorder():
+    """
+    Recorder of the phases instrumented by hooks
+
+    While disabled phase returns a shared phase doing nothing and timed
+    returns its iterable unchanged so that the hooks cost a method call,
+    while enabled the statistics of each phase are accumulated (from any
+    thread) and memory is traced by tracemalloc if asked
+    """
+
+    def __init__(self):
+        """
+        Initialize a disabled recorder
+        """
+        self.enabled = False
+        self.phases = {}
+        self.last = []  # names of the phases recorded most recently
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.peak_resets = 0  # resets of the traced peak by any thread
+        self.profiler = None
+        self.thread_profilers = []  # profilers of the other threads
+
+    def enable(self, trace_memory=True):
+        """
+        Start recording, tracing the allocated memory if trace_memory
+        (ignored before python 3.9 which can not reset the peak)
+        """
+        if trace_memory and CAN_TRACE_PEAKS and \
+                not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop recording (and tracing memory), the statistics are kept
+        """
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset(self):
+        """
+        Forget the statistics recorded
+        """
+        with self.lock:
+            self.phases = {}
+            self.last = []
+
+    def stack(self):
+        """
+        Return the stack of the phases entered by the current thread
+        """
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def reset_peak(self):
+        """
+        Reset the peak of the traced memory, counting the resets
+        """
+        with self.lock:
+            tracemalloc.reset_peak()
+            self.peak_resets += 1
+        self.local.peak_resets = getattr(self.local, "peak_resets", 0) + 1
+
+    def foreign_resets(self):
+        """
+        Return the number of resets of the peak by the other threads
+        """
+        return self.peak_resets - getattr(self.local, "peak_resets", 0)
+
+    def phase(self, name, points=0):
+        """
+        Return a context manager recording a call of the phase name
+        """
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name, points)
+
+    def timed(self, name, iterable):
+        """
+        Return the iterable, recording the time taken by each item and
+        their number of points as calls of the phase name
+        """
+        if not self.enabled:
+            return iterable
+        return self.iterate(name, iterable)
+
+    def iterate(self, name, iterable):
+        """
+        Yield the items of iterable recorded as calls of the phase name
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name) as phase:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                phase.add_points(len(item))
+            yield item
+
+    def record(self, name, seconds, points=0, peak_bytes=None):
+        """
+        Add a call of the phase name to its statistics
+        """
+        with self.lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats(name)
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.points += points
+            if peak_bytes is not None:
+                stats.peak_bytes = max(stats.peak_bytes or 0, peak_bytes)
+            if name in self.last:
+                self.last.remove(name)
+            self.last.append(name)
+
+    def stats(self):
+        """
+        Return the statistics of the phases as a dictionary of
+        dictionaries (see PhaseStats.as_dict) keyed by phase name
+        """
+        with self.lock:
+            return {name: stats.as_dict()
+                    for name, stats in self.phases.items()}
+
+    def summary(self, n_phases=4):
+        """
+        Return a line describing the n_phases phases recorded last
+        """
+        with self.lock:
+            return ", ".join(str(self.phases[name])
+                             for name in self.last[-n_phases:])
+
+    def start_profile(self):
+        """
+        Start profiling the calling thread with cProfile, the threads
+        running their work under profiled meanwhile are profiled too
+        """
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def profiled(self, function, *args):
+        """
+        Return function(*args), profiled on the calling thread if the
+        recorder is profiling, e.g. the work of a background thread
+        """
+        if self.profiler is None:
+            return function(*args)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # a single profiler covers every thread
+            return function(*args)
+        try:
+            return function(*args)
+        finally:
+            profiler.disable()
+            with self.lock:
+                self.thread_profilers.append(profiler)
+
+    def stop_profile(self, filename=PROFILE_FILE):
+        """
+        Stop profiling and dump the statistics of the calling thread and
+        of the threads profiled meanwhile (those done by now) into
+        filename (readable by pstats), return filename or None if not
+        profiling
+        """
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        stats = pstats.Stats(self.profiler)
+        with self.lock:
+            for profiler in self.thread_profilers:
+                stats.add(profiler)
+            self.thread_profilers = []
+        stats.dump_stats(filename)
+        self.profiler = None
+        return filename
+
+
+RECORDER = Recorder()  # recorder of the hooks of the package
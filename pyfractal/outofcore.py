@@ -0,0 +1,116 @@
+"""Module to write and read curves larger than memory as .npy files"""
+import os
+import tempfile
+import numpy as np
+
+WINDOW_POINTS = 2**18  # points mapped at once, 4 MiB of float64 points
+
+
+def write_header(file, n_points, dtype):
+    """
+    Write the .npy header of an (n_points, 2) array of dtype into the
+    binary file, return the offset of the data
+    """
+    header = {
+        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": False,
+        "shape": (n_points, 2)
+    }
+    if n_points < 2**31:  # version 1.0 headers are read by older numpy
+        np.lib.format.write_array_header_1_0(file, header)
+    else:
+        np.lib.format.write_array_header_2_0(file, header)
+    return file.tell()
+
+
+def read_header(file):
+    """
+    Read the .npy header of the binary file, return (offset of the data,
+    number of points, dtype) of the (n, 2) array it holds
+    raises ValueError if the file does not hold such an array
+    """
+    version = np.lib.format.read_magic(file)
+    if version == (1, 0):
+        shape, fortran_order, dtype = \
+            np.lib.format.read_array_header_1_0(file)
+    else:
+        shape, fortran_order, dtype = \
+            np.lib.format.read_array_header_2_0(file)
+    if fortran_order or len(shape) != 2 or shape[1] != 2:
+        raise ValueError("Not a curve of (n, 2) points")
+    return file.tell(), shape[0], dtype
+
+
+def write_npy(filename, chunks, n_points, dtype=np.float64,
+              window_points=WINDOW_POINTS):
+    """
+    Write the curve given as a stream of (n, 2) point arrays, n_points in
+    total, into the .npy file filename
+
+    The file is sized beforehand and filled through memory mapped windows
+    of at most window_points points, each unmapped once written, so that
+    the memory used (resident pages included) is bounded by a window and
+    a chunk whatever the size of the curve. It is written under a
+    temporary name then renamed so that readers never see a partial file
+    raises ValueError if the chunks do not hold n_points points
+    """
+    item_bytes = 2 * np.dtype(dtype).itemsize
+    directory = os.path.dirname(os.path.abspath(filename))
+    file = tempfile.NamedTemporaryFile(
+        dir=directory, suffix=".tmp", delete=False)
+    try:
+        with file:
+            offset = write_header(file, n_points, dtype)
+            file.truncate(offset + n_points * item_bytes)
+        filled = 0
+        for chunk in chunks:
+            start = 0
+            while start < len(chunk):
+                if filled >= n_points:
+                    raise ValueError(
+                        "More than {} points written".format(n_points))
+                size = min(len(chunk) - start, window_points,
+                           n_points - filled)
+                window = np.memmap(
+                    file.name, dtype=dtype, mode="r+",
+                    offset=offset + filled * item_bytes, shape=(size, 2))
+                window[:] = chunk[start:start + size]
+                del window  # unmapped, its pages are left to the system
+                start += size
+                filled += size
+        if filled != n_points:
+            raise ValueError("{} points written out of {}".format(
+                filled, n_points))
+        os.replace(file.name, filename)
+    except BaseException:
+        if os.path.exists(file.name):
+            os.remove(file.name)
+        raise
+
+
+def iter_npy(filename, chunk_size=WINDOW_POINTS):
+    """
+    Yield the points of the curve held by the .npy file filename as
+    (n, 2) arrays of chunk_size points (the last one possibly smaller),
+    each read from a memory mapped window unmapped before the next one
+    """
+    with open(filename, "rb") as file:
+        offset, n_points, dtype = read_header(file)
+    item_bytes = 2 * dtype.itemsize
+    for start in range(0, n_points, chunk_size):
+        window = np.memmap(
+            filename, dtype=dtype, mode="r",
+            offset=offset + start * item_bytes,
+            shape=(min(chunk_size, n_points - start), 2))
+        chunk = np.array(window)
+        del window
+        yield chunk
+
+
+def npy_points(filename):
+    """
+    Return the number of points of the curve held by the .npy file
+    filename
+    """
+    with open(filename, "rb") as file:
+        return read_header(file)[1]
@@ -0,0 +1,75 @@
+"""Module for generating fractal curves on multiple processes"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from .affine import AffineRules
+
+SUBTREES_PER_WORKER = 4  # granularity of the split of the rule tree
+
+
+def fill_subtrees(shm_name, shape, rules, base_length, level, nodes, start):
+    """
+    Worker: write the points of the subtrees nodes (composed maps of
+    curves of level) into the shared memory shm_name holding an array of
+    shape, starting at point index start
+    """
+    affine_rules = AffineRules(rules, base_length)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        points = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        sub_curve = affine_rules.relative_curve(level)
+        counts = np.where(nodes[3], 1, len(sub_curve))
+        affine_rules.apply(
+            nodes, sub_curve, out=points[start:start + counts.sum()])
+        del points  # release the buffer before closing
+    finally:
+        shm.close()
+
+
+def split_nodes(affine_rules, level, n_parts):
+    """
+    Expand the rule tree from level until there are n_parts subtrees,
+    return (sub_level, nodes) where nodes are the composed maps of the
+    subtrees of sub_level
+    """
+    nodes = affine_rules.compose(level, level)
+    sub_level = level
+    while len(nodes[0]) < n_parts and sub_level > 1:
+        nodes = affine_rules.expand(*nodes, sub_level)
+        sub_level -= 1
+    return sub_level, nodes
+
+
+def parallel_relative_curve(affine_rules, level, workers):
+    """
+    Return the relative curve of level (see AffineRules.relative_curve)
+    generated by workers processes
+
+    The top levels of the rule tree are split into contiguous ranges of
+    subtrees, each worker writing its range directly into a shared
+    memory output buffer, only the composed maps are pickled
+    """
+    sub_level, nodes = split_nodes(
+        affine_rules, level, workers * SUBTREES_PER_WORKER)
+    counts = np.where(nodes[3], 1, affine_rules.curve_size(sub_level))
+    ends = np.cumsum(counts)
+    shape = (int(ends[-1]), 2)
+    shm = shared_memory.SharedMemory(
+        create=True, size=max(1, shape[0] * 2 * 8))
+    try:
+        bounds = np.linspace(0, len(counts), workers + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    fill_subtrees, shm.name, shape, affine_rules.rules,
+                    affine_rules.base_length, sub_level,
+                    tuple(array[low:high] for array in nodes),
+                    int(ends[low] - counts[low]))
+                for low, high in zip(bounds[:-1], bounds[1:]) if high > low]
+            for future in futures:
+                future.result()  # raise errors of the workers
+        points = np.ndarray(shape, dtype=np.float64, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return points
@@ -5,6 +5,7 @@ import re
 from tkinter import filedialog, Button, Entry, Label, W, END, \
     Checkbutton, BooleanVar
 from pyfractal.rules_input import RulesInput
+from pyfractal.fastfractal import BudgetExceededError, format_count
 
 
 class Parameters():
@@ -29,6 +30,7 @@ class Parameters():
             "btn_save_as": None,
             "btn_clear_canvas": None,
             "btn_draw": None,
+            "btn_cancel_draw": None,
             "btn_save_params": None,
             "chkbtn_round_corners": None,
             "chkbtn_color": None
@@ -39,7 +41,9 @@ class Parameters():
         }
         self.labels = {
             "lbl_recursion_depth": None,
-            "lbl_base_length": None
+            "lbl_base_length": None,
+            "lbl_cost_estimate": None,
+            "lbl_progress": None
         }
         self.vars = {
             "round_corners": None,
@@ -50,6 +54,9 @@ class Parameters():
         self.init_recursion_depth_entry()
         self.init_base_length_entry()
         self.init_draw_button()
+        self.init_cancel_draw_button()
+        self.init_cost_estimate_label()
+        self.init_progress_label()
         self.init_save_curve_params_button()
         self.init_load_params_button()
         self.init_round_curve_checkbox()
@@ -67,20 +74,28 @@ class Parameters():
             file_name = filedialog.asksaveasfilename(
                 filetypes=[
                     ("Scalable Vector Graphics", "*.svg"),
+                    ("Compressed Scalable Vector Graphics", "*.svgz"),
                     ("Postscript", "*.ps"),
+                    ("Encapsulated Postscript", "*.eps"),
                     ("Portable Network Graphics", "*.png")
                 ],
                 initialdir=os.getcwd())
             if file_name:  # save option not cancelled by user
                 extension = re.search(r"\.[\w]+$", file_name)[0]
-                if extension == '.png':
-                    self.parent_class.save_png(file_name)
-                elif extension == ".ps":
-                    self.parent_class.save_postscript(file_name)
-                elif extension == ".svg":
-                    self.parent_class.save_canvas_svg(file_name)
-                else:
+                savers = {
+                    ".png": self.parent_class.save_png,
+                    ".ps": self.parent_class.save_postscript,
+                    ".eps": self.parent_class.save_postscript,
+                    ".svg": self.parent_class.save_svg,
+                    ".svgz": self.parent_class.save_svg
+                }
+                if extension not in savers:
                     raise TypeError("Unknown Filetype")
+                try:
+                    savers[extension](file_name)
+                except BudgetExceededError as error:
+                    self.labels["lbl_cost_estimate"].config(text=str(error))
+                    self.frame.bell()
 
         self.buttons["btn_save_as"] = Button(
             self.frame, text="Save Canvas As", command=save)
@@ -92,7 +107,7 @@ class Parameters():
         """
         def clear_canvas():
             """ Function to clear the canvas"""
-            self.parent_class.canvas.delete("all")
+            self.parent_class.clear_drawing()
 
         self.buttons["btn_clear_canvas"] = Button(
             self.frame, width=14, text="Clear", command=clear_canvas)
@@ -111,6 +126,8 @@ class Parameters():
             validate='key', validatecommand=vcmd)
         self.labels["lbl_recursion_depth"] = Label(
             self.frame, text="Recursion Depth (int)")
+        self.entries["ent_recursion_depth"].bind(
+            "<KeyRelease>", lambda event: self.update_cost_estimate())
         self.entries["ent_recursion_depth"].grid(
             row=0, column=1, sticky=W, pady=(30, 0))
         self.labels["lbl_recursion_depth"].grid(
@@ -169,13 +186,74 @@ class Parameters():
             self.parent_class.classes["fractal"].set_base_length(base_length)
             is_curved = self.vars["round_corners"].get()
             fill_color = self.vars["fill_color"].get()
-            self.parent_class.classes["fractal"].draw_fractal(
-                recursion_depth, is_curved, fill_color)
+            self.update_cost_estimate()
+            try:
+                self.parent_class.draw_curve(
+                    recursion_depth, is_curved, fill_color,
+                    on_progress=self.show_progress)
+            except BudgetExceededError as error:
+                self.labels["lbl_cost_estimate"].config(text=str(error))
+                self.frame.bell()
 
         self.buttons["btn_draw"] = Button(
             self.frame, width=14, text="Draw Fractal", command=draw)
         self.buttons["btn_draw"].grid(row=3, column=0)
 
+    def init_cancel_draw_button(self):
+        """
+        Initialize the button stopping the fractal being drawn, the lines
+        already drawn are kept on the canvas
+        """
+        def cancel_draw():
+            """ Function to cancel the drawing in progress"""
+            if self.parent_class.cancel_drawing():
+                self.labels["lbl_progress"].config(text="Cancelled")
+            else:
+                self.frame.bell()  # nothing being drawn
+
+        self.buttons["btn_cancel_draw"] = Button(
+            self.frame, width=14, text="Cancel", command=cancel_draw)
+        self.buttons["btn_cancel_draw"].grid(row=3, column=2)
+
+    def init_cost_estimate_label(self):
+        """
+        Label showing the estimated cost of drawing the fractal with the
+        entered recursion depth, updated as the depth is typed
+        """
+        self.labels["lbl_cost_estimate"] = Label(self.frame, text="")
+        self.labels["lbl_cost_estimate"].grid(
+            row=2, column=0, columnspan=2, sticky=W)
+
+    def init_progress_label(self):
+        """
+        Label showing the progress of the fractal being drawn
+        """
+        self.labels["lbl_progress"] = Label(self.frame, text="")
+        self.labels["lbl_progress"].grid(row=2, column=2, sticky=W)
+
+    def show_progress(self, fraction):
+        """
+        Show the fraction of the fractal drawn in the progress label
+        """
+        self.labels["lbl_progress"].config(
+            text="Done" if fraction >= 1 else "{:.0%}".format(fraction))
+
+    def update_cost_estimate(self):
+        """
+        Show the number of points, memory and time estimated for
+        generating the whole fractal of the entered recursion depth in
+        memory (as for filling or saving it, lines are drawn streamed
+        and culled to the view)
+        """
+        fractal = self.parent_class.classes["fractal"]
+        recursion_depth = self.get_recursion_depth() or \
+            fractal.recursion_depth
+        cost = fractal.estimate_cost(recursion_depth)
+        self.labels["lbl_cost_estimate"].config(
+            text="Whole curve: {} points, ~{} MB, ~{:.3g} s".format(
+                format_count(cost.points), format_count(cost.bytes // 2**20),
+                cost.seconds))
+
     def init_save_curve_params_button(self):
         """
         Initialize Button to invoke save parameters to a file
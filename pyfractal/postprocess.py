@@ -0,0 +1,319 @@
+"""Module for vectorized post processing of curves (arrays of points)"""
+import numpy as np
+
+COLLINEAR_TOLERANCE = 1e-12  # relative tolerance of the collinearity test
+
+
+def repeated_mask(curve, previous=None, tolerance=0.0):
+    """
+    Return a mask of the points of curve ((N, 2) array) which are not
+    within tolerance of the last point kept before them (previous, the
+    last point kept before the curve, for the first)
+
+    Exact repeats are found in a vectorized pass. With a tolerance, the
+    points after a step within tolerance are compared with the last kept
+    point in a sequential scan so that slow drifts are not dropped
+    """
+    steps = np.diff(curve, axis=0, prepend=(
+        curve[:1] if previous is None else previous[np.newaxis]))
+    if not tolerance:
+        is_new = (steps != 0).any(axis=1)
+        if previous is None:
+            is_new[0] = True
+        return is_new
+    is_new = np.hypot(steps[:, 0], steps[:, 1]) > tolerance
+    if previous is None:
+        is_new[0] = True
+    if is_new.all():
+        return is_new
+    # from the first point dropped, compare with the last point kept
+    first = int(np.argmin(is_new))
+    last_x, last_y = curve[first - 1] if first else previous
+    tolerance2 = tolerance**2
+    for index, (x, y) in enumerate(curve[first:].tolist(), first):
+        is_new[index] = (x - last_x)**2 + (y - last_y)**2 > tolerance2
+        if is_new[index]:
+            last_x, last_y = x, y
+    return is_new
+
+
+def collinear_mask(curve, tolerance=COLLINEAR_TOLERANCE):
+    """
+    Return a mask of the inner points of curve ((N, 2) array, N >= 2,
+    without repeated points) which can be dropped without changing
+    the drawn line i.e. lying on the segment joining their neighbours,
+    the mask has N-2 entries
+    """
+    before = curve[1:-1] - curve[:-2]
+    after = curve[2:] - curve[1:-1]
+    cross = before[:, 0] * after[:, 1] - before[:, 1] * after[:, 0]
+    dot = before[:, 0] * after[:, 0] + before[:, 1] * after[:, 1]
+    norms = np.hypot(before[:, 0], before[:, 1]) * \
+        np.hypot(after[:, 0], after[:, 1])
+    return (np.abs(cross) <= tolerance * norms) & (dot > 0)
+
+
+def rounded_points(curve, first_weight=3.0):
+    """
+    Return the midpoints of consecutive points of curve weighted
+    alternately first_weight and 1/first_weight towards the next point
+    """
+    round_weight = np.where(
+        np.arange(len(curve) - 1) % 2, 1 / first_weight,
+        first_weight)[:, np.newaxis]
+    return (curve[:-1] + curve[1:] * round_weight) / (1 + round_weight)
+
+
+def grid_mask(curve, cell_size, previous_cell=None):
+    """
+    Return a mask of the points of curve ((N, 2) array) falling in another
+    square cell of cell_size than the point before them (previous_cell for
+    the first) and the cell of the last point
+    """
+    cells = np.floor(curve / cell_size)
+    steps = np.diff(cells, axis=0, prepend=(
+        cells[:1] if previous_cell is None else previous_cell[np.newaxis]))
+    is_new = (steps != 0).any(axis=1)
+    if previous_cell is None:
+        is_new[0] = True
+    return is_new, cells[-1]
+
+
+def douglas_peucker_mask(curve, tolerance):
+    """
+    Return a mask of the points of curve ((N, 2) array) kept by the
+    Douglas-Peucker simplification within tolerance, the end points
+    are always kept
+
+    All the segments of a level of the recursion are split at once,
+    each level being a vectorized pass over the points
+    """
+    n_points = len(curve)
+    is_kept = np.zeros(n_points, dtype=bool)
+    is_kept[[0, -1]] = True
+    while True:
+        kept = np.flatnonzero(is_kept)
+        # segment of each point, given by the index of its start in kept
+        segment = np.searchsorted(kept, np.arange(n_points), 'right') - 1
+        segment = np.minimum(segment, len(kept) - 2)
+        start, end = curve[kept[segment]], curve[kept[segment + 1]]
+        direction = end - start
+        relative = curve - start
+        length2 = np.einsum('ij,ij->i', direction, direction)
+        ratio = np.einsum('ij,ij->i', relative, direction) / \
+            np.where(length2 > 0, length2, 1)
+        relative -= np.clip(ratio, 0, 1)[:, np.newaxis] * direction
+        distances = np.hypot(relative[:, 0], relative[:, 1])
+        distances[is_kept] = 0
+        farthest = np.maximum.reduceat(distances, kept[:-1])
+        is_split = (distances > tolerance) & \
+            (distances == farthest[segment])
+        if not is_split.any():
+            return is_kept
+        # split each segment at (the first of) its farthest points
+        split = np.flatnonzero(is_split)
+        _, first = np.unique(segment[split], return_index=True)
+        is_kept[split[first]] = True
+
+
+class Simplifier():
+    """
+    Streaming polyline simplification within tolerance (e.g. a pixel)
+
+    Points are first thinned to one per run of consecutive points in a
+    square cell of diagonal tolerance / 2 (a curve coming back to a cell
+    keeps a point per visit, so the output is not bounded by the grid),
+    then simplified by Douglas-Peucker within tolerance / 2 per chunk
+    (chunk boundaries being kept)
+    """
+
+    def __init__(self, tolerance):
+        """
+        Initialize the simplifier for a new curve
+        """
+        self.tolerance = tolerance
+        self.cell_size = tolerance / 2**1.5
+        self.last_cell = None
+        self.last_point = None  # last point, kept if the curve ends there
+
+    def feed(self, chunk):
+        """
+        Return the simplified points of the next chunk of the curve
+        """
+        if not len(chunk):
+            return chunk
+        is_new, self.last_cell = grid_mask(
+            chunk, self.cell_size, self.last_cell)
+        thinned = chunk[is_new]
+        if not is_new[-1]:
+            self.last_point = chunk[-1:]
+        else:
+            self.last_point = None
+        if len(thinned) < 3:
+            return thinned
+        return thinned[douglas_peucker_mask(thinned, self.tolerance / 2)]
+
+    def flush(self):
+        """
+        Return the points remaining at the end of the curve
+        """
+        if self.last_point is None:
+            return np.empty((0, 2))
+        return self.last_point  # retain the last point
+
+
+class CornerRounder():
+    """
+    Streaming corner rounding, replacing two consecutive points by their
+    midpoint weighted alternately 3:1 and 1:3 while retaining the start
+    and end points
+    """
+
+    def __init__(self):
+        """
+        Initialize the rounder for a new curve
+        """
+        self.last_point = None
+        self.parity = 0  # parity of the index of the next midpoint
+
+    def feed(self, chunk):
+        """
+        Return the rounded points of the next chunk of the curve
+        """
+        if not len(chunk):
+            return chunk
+        if self.last_point is None:
+            head = chunk[:1]  # retain the first point
+            points = chunk
+        else:
+            head = chunk[:0]
+            points = np.concatenate((self.last_point, chunk))
+        rounded = rounded_points(points, 1 / 3 if self.parity else 3.0)
+        self.parity = (self.parity + len(rounded)) % 2
+        self.last_point = points[-1:]
+        return np.concatenate((head, rounded))
+
+    def flush(self):
+        """
+        Return the points remaining at the end of the curve
+        """
+        if self.last_point is None:
+            return np.empty((0, 2))
+        return self.last_point  # retain the last point
+
+
+class PostProcessor():
+    """
+    Fused post processing of a curve given as a whole array or as a
+    stream of chunks: removal of repeated (or, with tolerance, nearly
+    repeated) points, lossless merging of collinear runs, rounding of
+    the corners repeated round_iterations times and simplification
+    within simplify_tolerance (None to keep every point)
+
+    The corners are rounded before simplifying, the rounded curve
+    depending on every point and on the parity of its midpoints
+    """
+
+    def __init__(self, tolerance=0.0, merge_collinear=True,
+                 round_iterations=0, simplify_tolerance=None):
+        """
+        Initialize the post processor for a new curve
+        """
+        self.tolerance = tolerance
+        self.merge_collinear = merge_collinear
+        self.simplifier = None
+        if simplify_tolerance:
+            self.simplifier = Simplifier(simplify_tolerance)
+        self.rounders = [CornerRounder() for _ in range(round_iterations)]
+        # last two points of the deduplicated curve, the last one (unless
+        # it is the first point of the curve) is yet to be decided
+        self.tail = None
+        self.last_point = None  # last point if dropped as a near repeat
+
+    def feed(self, chunk):
+        """
+        Return the processed points of the next chunk of the curve
+        """
+        chunk = np.asarray(chunk)
+        previous = None if self.tail is None else self.tail[-1]
+        is_new = repeated_mask(chunk, previous, self.tolerance)
+        if len(chunk):
+            self.last_point = None if is_new[-1] else chunk[-1:]
+        chunk = chunk[is_new]
+        if not len(chunk):
+            return self.downstream(chunk)
+        if self.tail is None:
+            head, points = chunk[:1], chunk  # retain the first point
+        else:
+            head, points = chunk[:0], np.concatenate((self.tail, chunk))
+        # points[0] is decided, points[-1] is decided with the next chunk
+        decided = points[1:-1]
+        if self.merge_collinear and len(points) > 2:
+            decided = decided[~collinear_mask(points)]
+        self.tail = points[-2:]
+        return self.downstream(np.concatenate((head, decided)))
+
+    def flush(self):
+        """
+        Return the points remaining at the end of the curve
+        """
+        if self.tail is None or len(self.tail) < 2:
+            points = np.empty((0, 2))
+        else:
+            points = self.tail[-1:]
+        if self.last_point is not None and self.tolerance:
+            # retain the last point, even near the last one kept
+            points = np.concatenate((points, self.last_point))
+        for rounder in self.rounders:
+            points = np.concatenate((rounder.feed(points), rounder.flush()))
+        if self.simplifier is not None:
+            points = np.concatenate((
+                self.simplifier.feed(points), self.simplifier.flush()))
+        return points
+
+    def downstream(self, points):
+        """
+        Pass points through the corner rounders and the simplifier
+        """
+        for rounder in self.rounders:
+            points = rounder.feed(points)
+        if self.simplifier is not None:
+            points = self.simplifier.feed(points)
+        return points
+
+    def process(self, curve):
+        """
+        Return the whole processed curve
+        """
+        return np.concatenate((self.feed(curve), self.flush()))
+
+
+def remove_repeated_points(curve, tolerance=0.0):
+    """
+    Return the curve ((N, 2) array) without the points repeating (within
+    tolerance) the last point kept before them, the last point being
+    kept with a tolerance
+    """
+    curve = np.asarray(curve)
+    is_new = repeated_mask(curve, tolerance=tolerance)
+    if tolerance and len(curve):
+        is_new[-1] = True
+    return curve[is_new]
+
+
+def round_corners(curve, iterations=1):
+    """
+    Return the curve ((N, 2) array) with rounded corners, iterations times
+
+    Replaces two points with their midpoint while retaining the
+    start and end points, the midpoints are weighted alternately
+    3:1 and 1:3 towards the next point
+    """
+    curve = np.asarray(curve)
+    for _ in range(iterations):
+        rounded_curve = np.empty((len(curve) + 1, 2), dtype=curve.dtype)
+        rounded_curve[0] = curve[0]  # retain the first point
+        rounded_curve[1:-1] = rounded_points(curve)
+        rounded_curve[-1] = curve[-1]  # retain the last point
+        curve = rounded_curve
+    return curve
@@ -0,0 +1,105 @@
+"""Module to write curves as (encapsulated) postscript without a canvas"""
+from math import ceil
+import numpy as np
+from .svg import TRAILING_ZEROS, TRAILING_POINTS
+
+DEFAULT_PRECISION = 2  # decimals of the coordinates written
+DEFAULT_LINE_WIDTH = 1.0  # points (1/72 inch) of the lines
+PATH_POINTS = 1000  # points per stroked path, within interpreter limits
+
+
+def format_operations(points, operator, precision=DEFAULT_PRECISION):
+    """
+    Return the operator (e.g. lineto) applied to each of the points
+    ((n, 2) array) formatted with at most precision decimals, a line each
+    """
+    template = "{{:.{0}f}} {{:.{0}f}} {1}\n".format(precision, operator)
+    text = (template * len(points)).format(*points.ravel().tolist())
+    if precision > 0:
+        text = TRAILING_POINTS.sub("", TRAILING_ZEROS.sub(r"\1", text))
+    return text
+
+
+def path_operations(chunks, precision=DEFAULT_PRECISION, path_points=None):
+    """
+    Yield the path construction of the polyline given as a stream of
+    (n, 2) point arrays, a moveto followed by linetos, stroking and
+    starting a new path from the last point every path_points points
+    if given
+    """
+    last_point = None
+    n_points = 0  # points in the current path
+    for chunk in chunks:
+        points = np.asarray(chunk, dtype=np.float64)
+        while len(points):
+            if last_point is None:
+                yield format_operations(points[:1], "m", precision)
+                last_point, points = points[:1], points[1:]
+                n_points = 1
+                continue
+            if path_points is not None and n_points >= path_points:
+                yield "s\n" + format_operations(last_point, "m", precision)
+                n_points = 1
+            taken = len(points) if path_points is None else \
+                min(len(points), path_points - n_points)
+            yield format_operations(points[:taken], "l", precision)
+            last_point, points = points[taken - 1:taken], points[taken:]
+            n_points += taken
+
+
+def write_postscript(file, chunks, bounding_box, precision=DEFAULT_PRECISION,
+                     line_width=DEFAULT_LINE_WIDTH, fill_rule=None,
+                     encapsulated=True):
+    """
+    Write the postscript document of the curve given as a stream of chunks
+    into the text file, bounding_box (x_min, y_min, x_max, y_max) giving
+    its extent in points (canvas coordinates, y pointing down), as a
+    polyline of line_width or as a polygon filled with fill_rule
+    ("evenodd" or "nonzero") if given
+    """
+    margin = line_width
+    x_min, y_min, x_max, y_max = bounding_box
+    width, height = x_max - x_min + 2 * margin, y_max - y_min + 2 * margin
+    file.write("%!PS-Adobe-3.0 EPSF-3.0\n" if encapsulated
+               else "%!PS-Adobe-3.0\n")
+    file.write(
+        "%%BoundingBox: 0 0 {} {}\n"
+        "%%HiResBoundingBox: 0 0 {:.3f} {:.3f}\n"
+        "%%Creator: pyfractal\n"
+        "%%Pages: 1\n"
+        "%%EndComments\n".format(ceil(width), ceil(height), width, height))
+    file.write(
+        "/m {moveto} bind def\n"
+        "/l {lineto} bind def\n"
+        "/s {stroke} bind def\n"
+        "%%Page: 1 1\n"
+        "gsave\n")
+    # flip the y axis of the canvas coordinates into the bounding box
+    file.write("{:.3f} {:.3f} translate 1 -1 scale\n".format(
+        margin - x_min, margin + y_max))
+    file.write("{} setlinewidth 1 setlinejoin 1 setlinecap\n".format(
+        line_width))
+    file.write("newpath\n")
+    path_points = None if fill_rule else PATH_POINTS
+    for operations in path_operations(chunks, precision, path_points):
+        file.write(operations)
+    if fill_rule:
+        file.write("closepath {}\n".format(
+            "eofill" if fill_rule == "evenodd" else "fill"))
+    else:
+        file.write("s\n")
+    file.write("grestore\nshowpage\n%%EOF\n")
+
+
+def save_postscript(filename, chunks, bounding_box, encapsulated=None,
+                    **options):
+    """
+    Save the curve given as a stream of chunks as a postscript file,
+    encapsulated if encapsulated or, when None, if filename ends in .eps,
+    options are those of write_postscript
+    """
+    if encapsulated is None:
+        encapsulated = filename.lower().endswith(".eps")
+    with open(filename, "w") as file:
+        write_postscript(file, chunks, bounding_box,
+                         encapsulated=encapsulated, **options)
@@ -0,0 +1,198 @@
+"""Module to rasterize curves into images without a canvas"""
+import numpy as np
+from PIL import Image, ImageDraw
+
+DEFAULT_DPI = 96  # resolution of the saved images
+DEFAULT_LINE_WIDTH = 0.75  # points (1/72 inch), a pixel at DEFAULT_DPI
+SUPERSAMPLE = 4  # subpixels per pixel along each axis for anti-aliasing
+MAX_SUBPIXELS = 2**26  # supersampling is reduced beyond this many subpixels
+FILL_RULES = ("evenodd", "nonzero")
+
+
+def fit_transform(bounding_box, width, height, margin=0.05):
+    """
+    Return (scale, offset) mapping the bounding box (x_min, y_min, x_max,
+    y_max) centered into width x height leaving margin (fraction of the
+    size) on each side, a point p is mapped to p * scale + offset
+    """
+    x_min, y_min, x_max, y_max = bounding_box
+    span_x, span_y = x_max - x_min, y_max - y_min
+    scale = min(width * (1 - 2 * margin) / span_x if span_x else np.inf,
+                height * (1 - 2 * margin) / span_y if span_y else np.inf)
+    if not np.isfinite(scale):
+        scale = 1.0  # a single point
+    offset = np.array((width - span_x * scale, height - span_y * scale)) / 2 \
+        - np.array((x_min, y_min)) * scale
+    return scale, offset
+
+
+def edge_crossings(starts, ends, n_rows):
+    """
+    Return (rows, x, direction) of the crossings of the edges from starts
+    to ends ((N, 2) arrays in pixel coordinates) with the centers of the
+    pixel rows in [0, n_rows), direction being +1 for downward edges and
+    -1 for upward ones
+    """
+    y_low = np.minimum(starts[:, 1], ends[:, 1])
+    y_high = np.maximum(starts[:, 1], ends[:, 1])
+    # rows whose center y + 0.5 is in [y_low, y_high)
+    first = np.clip(np.ceil(y_low - 0.5), 0, n_rows).astype(np.int64)
+    last = np.clip(np.ceil(y_high - 0.5), 0, n_rows).astype(np.int64)
+    counts = last - first
+    edges = np.repeat(np.arange(len(starts)), counts)
+    rows = np.arange(len(edges)) - np.repeat(np.cumsum(counts) - counts,
+                                             counts) + first[edges]
+    start, end = starts[edges], ends[edges]
+    ratio = (rows + 0.5 - start[:, 1]) / (end[:, 1] - start[:, 1])
+    x_cross = start[:, 0] + ratio * (end[:, 0] - start[:, 0])
+    direction = np.where(end[:, 1] > start[:, 1], 1, -1)
+    return rows, x_cross, direction
+
+
+class Rasterizer():
+    """
+    Anti-aliased rasterization of curves, given as streams of (n, 2) point
+    arrays, into a width x height grayscale image drawn black on white
+
+    Lines are drawn by Pillow and polygons filled by a NumPy scanline
+    accumulating the winding numbers of the subpixels, both on a grid
+    supersampled SUPERSAMPLE times along each axis which is averaged
+    down to the pixels
+    """
+
+    def __init__(self, width, height, dpi=DEFAULT_DPI,
+                 line_width=DEFAULT_LINE_WIDTH, supersample=SUPERSAMPLE):
+        """
+        Initialize a blank image, line_width is in points (1/72 inch)
+        """
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.line_width = line_width
+        while supersample > 1 and \
+                width * height * supersample**2 > MAX_SUBPIXELS:
+            supersample -= 1
+        self.supersample = supersample
+        self.scale = 1.0
+        self.offset = np.zeros(2)
+        self.subpixels = Image.new(
+            "L", (width * supersample, height * supersample), 0)
+
+    def fit(self, bounding_box, margin=0.05):
+        """
+        Map the bounding box (x_min, y_min, x_max, y_max) of the curve
+        centered into the image, see fit_transform, return the scale
+        """
+        self.scale, self.offset = fit_transform(
+            bounding_box, self.width, self.height, margin)
+        return self.scale
+
+    def set_transform(self, scale, offset):
+        """
+        Map a point p of the curve to the pixel p * scale + offset
+        """
+        self.scale = scale
+        self.offset = np.asarray(offset, dtype=np.float64)
+
+    def is_blank(self):
+        """
+        True if nothing has been drawn yet
+        """
+        return self.subpixels.getbbox() is None
+
+    def to_subpixels(self, points):
+        """
+        Return the points mapped to the supersampled grid
+        """
+        return (np.asarray(points, dtype=np.float64) * self.scale +
+                self.offset) * self.supersample
+
+    def draw_lines(self, chunks):
+        """
+        Draw the curve given as a stream of chunks as a polyline of
+        line_width, return the number of points drawn
+        """
+        draw = ImageDraw.Draw(self.subpixels)
+        width = max(1, round(
+            self.line_width * self.dpi / 72 * self.supersample))
+        last_point = None
+        n_points = 0
+        for chunk in chunks:
+            if not len(chunk):
+                continue
+            # pixels are centered on integer coordinates in Pillow
+            points = self.to_subpixels(chunk) - 0.5
+            n_points += len(points)
+            if last_point is not None:
+                points = np.concatenate((last_point, points))
+            last_point = points[-1:]
+            if len(points) > 1:
+                draw.line(points.ravel().tolist(), fill=255, width=width,
+                          joint="curve" if width > 2 else None)
+        return n_points
+
+    def fill(self, chunks, fill_rule="evenodd"):
+        """
+        Fill the polygon given as a stream of chunks of its vertices,
+        closed by joining the last vertex to the first, with fill_rule
+        among FILL_RULES, return the number of vertices
+        """
+        if fill_rule not in FILL_RULES:
+            raise ValueError("Unknown fill rule {}".format(fill_rule))
+        n_columns, n_rows = self.subpixels.size
+        # winding number changes along the rows, one extra column for
+        # crossings right of the image
+        changes = np.zeros(n_rows * (n_columns + 1), dtype=np.int32)
+        first_point = last_point = None
+        n_points = 0
+        for chunk in chunks:
+            if not len(chunk):
+                continue
+            points = self.to_subpixels(chunk)
+            n_points += len(points)
+            if first_point is None:
+                first_point = points[:1]
+            if last_point is not None:
+                points = np.concatenate((last_point, points))
+            last_point = points[-1:]
+            self.add_crossings(changes, points[:-1], points[1:])
+        if first_point is not None:
+            self.add_crossings(changes, last_point, first_point)
+        winding = np.cumsum(changes.reshape(n_rows, n_columns + 1),
+                            axis=1)[:, :-1]
+        is_inside = winding % 2 == 1 if fill_rule == "evenodd" \
+            else winding != 0
+        inside = Image.fromarray(is_inside.astype(np.uint8) * 255)
+        self.subpixels.paste(255, mask=inside)
+        return n_points
+
+    def add_crossings(self, changes, starts, ends):
+        """
+        Accumulate the winding number changes of the edges from starts to
+        ends at the first subpixel whose center is right of each crossing
+        """
+        n_columns, n_rows = self.subpixels.size
+        rows, x_cross, direction = edge_crossings(starts, ends, n_rows)
+        columns = np.clip(np.ceil(x_cross - 0.5), 0, n_columns).astype(
+            np.int64)
+        indices, position = np.unique(rows * (n_columns + 1) + columns,
+                                      return_inverse=True)
+        changes[indices] += np.bincount(
+            position.ravel(), weights=direction).astype(np.int32)
+
+    def image(self):
+        """
+        Return the anti-aliased image (PIL Image of mode L)
+        """
+        samples = self.supersample
+        coverage = np.asarray(self.subpixels, dtype=np.float64).reshape(
+            self.height, samples, self.width, samples).mean(axis=(1, 3))
+        return Image.fromarray(np.round(255 - coverage).astype(np.uint8))
+
+    def save(self, filename, image_format=None):
+        """
+        Save the image into filename (format guessed from the extension
+        unless given) recording its dpi
+        """
+        self.image().save(filename, format=image_format,
+                          dpi=(self.dpi, self.dpi))
@@ -4,6 +4,7 @@ from tkinter import Frame, Button, Entry, BooleanVar, \
 import re
 from math import cos, sin
 from math import pi as PI
+from pyfractal.instrument import RECORDER
 RAD_FAC = PI / 180  # factor to multiply to convert degrees to radians
 DEG_FAC = 180 / PI  # factor multiplied to convert radians to degree
 
@@ -226,13 +227,15 @@ class RulesInput():
         """
         # Not the best way to do it but the curve size is of constant
         # order, <20 segments, so it wouldnt create much difference
-        extracted_rules = self.extract_rules()
-        self.set_rules_in_curve(extracted_rules)
-        # set the rules in the parent curve dynamically
-        curve = self.form_base_curve(extracted_rules)
-        self.preview_canvas.delete("all")
-        if len(curve) > 1:  # draw only if there are more than one points
-            self.preview_canvas.create_line(curve, arrow=LAST)
+        with RECORDER.phase("preview") as phase:
+            extracted_rules = self.extract_rules()
+            self.set_rules_in_curve(extracted_rules)
+            # set the rules in the parent curve dynamically
+            curve = self.form_base_curve(extracted_rules)
+            phase.add_points(len(curve))
+            self.preview_canvas.delete("all")
+            if len(curve) > 1:  # draw only if there are more than one points
+                self.preview_canvas.create_line(curve, arrow=LAST)
 
     def init_info_labels(self):
         """
@@ -0,0 +1,95 @@
+"""Module to write curves as svg files without a canvas"""
+import gzip
+import re
+import numpy as np
+
+DEFAULT_PRECISION = 2  # decimals of the coordinates written
+DEFAULT_STROKE_WIDTH = 1.0  # user units (pixels) of the lines
+TRAILING_ZEROS = re.compile(r"(\.\d*?)0+(?= )")
+TRAILING_POINTS = re.compile(r"\.(?= )")
+
+
+def format_numbers(values, precision=DEFAULT_PRECISION):
+    """
+    Return the values (array) formatted with at most precision decimals,
+    each followed by a space
+    """
+    values = values.ravel().tolist()
+    text = ("{:.%df} " % precision * len(values)).format(*values)
+    if precision > 0:
+        text = TRAILING_POINTS.sub("", TRAILING_ZEROS.sub(r"\1", text))
+    return text
+
+
+def path_data(chunks, precision=DEFAULT_PRECISION, relative=True):
+    """
+    Yield the path data (d attribute) of the polyline given as a stream of
+    (n, 2) point arrays, a line per chunk, with relative (l) or absolute
+    (L) line commands
+
+    The coordinates are rounded to precision decimals before taking the
+    relative steps so that the rounding errors do not accumulate
+    """
+    last_point = None
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        points = np.round(np.asarray(chunk, dtype=np.float64), precision)
+        if last_point is None:
+            yield "M" + format_numbers(points[0], precision)
+            previous, points = points[0], points[1:]
+            if not len(points):
+                last_point = previous
+                continue
+        else:
+            previous = last_point
+        last_point = points[-1]
+        if relative:
+            steps = np.diff(points, axis=0, prepend=previous[np.newaxis])
+            yield "\nl" + format_numbers(np.round(steps, precision), precision)
+        else:
+            yield "\nL" + format_numbers(points, precision)
+
+
+def write_svg(file, chunks, bounding_box, precision=DEFAULT_PRECISION,
+              relative=True, stroke_width=DEFAULT_STROKE_WIDTH,
+              fill_rule=None):
+    """
+    Write the svg document of the curve given as a stream of chunks into
+    the text file, bounding_box (x_min, y_min, x_max, y_max) giving its
+    size, as a polyline of stroke_width or as a polygon filled with
+    fill_rule ("evenodd" or "nonzero") if given
+    """
+    margin = stroke_width
+    x_min, y_min, x_max, y_max = bounding_box
+    width, height = x_max - x_min + 2 * margin, y_max - y_min + 2 * margin
+    size = format_numbers(np.array((width, height)), precision).split()
+    view_box = format_numbers(np.array(
+        (x_min - margin, y_min - margin, width, height)), precision).strip()
+    file.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}" '
+        'viewBox="{}">\n'.format(size[0], size[1], view_box))
+    if fill_rule:
+        file.write('<path fill="black" fill-rule="{}" stroke="none" '
+                   'd="'.format(fill_rule))
+    else:
+        file.write('<path fill="none" stroke="black" stroke-width="{}" '
+                   'stroke-linejoin="round" stroke-linecap="round" '
+                   'd="'.format(stroke_width))
+    for data in path_data(chunks, precision, relative):
+        file.write(data)
+    file.write('z"/>\n</svg>\n' if fill_rule else '"/>\n</svg>\n')
+
+
+def save_svg(filename, chunks, bounding_box, compress=None, **options):
+    """
+    Save the curve given as a stream of chunks as an svg file, gzip
+    compressed if compress or, when None, if filename ends in .svgz,
+    options are those of write_svg
+    """
+    if compress is None:
+        compress = filename.lower().endswith(".svgz")
+    opener = gzip.open if compress else open
+    with opener(filename, "wt", encoding="utf-8") as file:
+        write_svg(file, chunks, bounding_box, **options)
@@ -0,0 +1,194 @@
+"""Module to render curves into pyramids of png tiles for deep zoom"""
+import hashlib
+import io
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from .fastfractal import load_fractal, DEFAULT_CHUNK_SIZE
+from . import raster
+
+TILE_SIZE = 256  # pixels along each side of a tile
+TILE_TOLERANCE = 0.5  # pixels, subtrees spanning less are drawn as chords
+TILE_MARGIN = 0.05  # fraction of the curve size left around it at zoom 0
+FRACTALS = {}  # curves loaded by a worker process, keyed by path
+
+
+def world_square(bounding_box, margin=TILE_MARGIN):
+    """
+    Return (x_min, y_min, size) of the square centered on the bounding box
+    (x_min, y_min, x_max, y_max) holding it with margin (fraction of its
+    size) on each side, the extent of the single tile of zoom 0
+    """
+    x_min, y_min, x_max, y_max = bounding_box
+    size = max(x_max - x_min, y_max - y_min, 1e-9) * (1 + 2 * margin)
+    return ((x_min + x_max - size) / 2, (y_min + y_max - size) / 2, size)
+
+
+def tile_transform(square, zoom, column, row, tile_size=TILE_SIZE):
+    """
+    Return (scale, offset) mapping a point p of the curve to the pixel
+    p * scale + offset of the tile at column, row of zoom, the world
+    square being split into 2**zoom tiles along each side
+    """
+    x_min, y_min, size = square
+    scale = tile_size * 2**zoom / size
+    return scale, (-tile_size * column - x_min * scale,
+                   -tile_size * row - y_min * scale)
+
+
+def worker_fractal(path):
+    """
+    Return the FastFractal of the curve json file path, loaded once per
+    worker process so that its compiled rules are reused across tiles
+    """
+    fractal = FRACTALS.get(path)
+    if fractal is None:
+        fractal = FRACTALS[path] = load_fractal(path)
+    return fractal
+
+
+def render_tile(path, depth, square, zoom, column, row,
+                tile_size=TILE_SIZE, line_width=raster.DEFAULT_LINE_WIDTH,
+                fill_rule=None):
+    """
+    Worker: render the tile at column, row of zoom of the curve of depth
+    of the json file path, return its png bytes or None if the tile is
+    blank
+
+    Only the subtrees of the rule tree crossing the tile (grown by the
+    line width) are walked and those spanning less than TILE_TOLERANCE
+    pixels at this zoom are drawn as chords (see FastFractal.iter_points)
+    so that a tile costs about its visible detail whatever the zoom.
+    Culled subtrees are replaced by chords within their bounding disk,
+    which does not change the winding numbers inside the tile when
+    filling
+    """
+    fractal = worker_fractal(path)
+    scale, offset = tile_transform(square, zoom, column, row, tile_size)
+    rasterizer = raster.Rasterizer(tile_size, tile_size, line_width=line_width)
+    rasterizer.set_transform(scale, offset)
+    margin = (line_width * rasterizer.dpi / 72 + 1) / scale
+    viewport = (-offset[0] / scale - margin, -offset[1] / scale - margin,
+                (tile_size - offset[0]) / scale + margin,
+                (tile_size - offset[1]) / scale + margin)
+    chunks = fractal.iter_points(depth, DEFAULT_CHUNK_SIZE, viewport,
+                                 TILE_TOLERANCE, scale)
+    if fill_rule:
+        rasterizer.fill(chunks, fill_rule)
+    else:
+        rasterizer.draw_lines(chunks)
+    if rasterizer.is_blank():
+        return None
+    data = io.BytesIO()
+    rasterizer.image().save(data, format="PNG")
+    return data.getvalue()
+
+
+def tile_path(output_dir, zoom, column, row):
+    """
+    Return the file of the tile at column, row of zoom, laid out as
+    output_dir/zoom/column/row.png (XYZ layout)
+    """
+    return os.path.join(output_dir, str(zoom), str(column),
+                        "{}.png".format(row))
+
+
+def children(column, row):
+    """
+    Return the (column, row) of the four tiles of the next zoom covering
+    the tile at column, row
+    """
+    return [(2 * column + d_column, 2 * row + d_row)
+            for d_row in (0, 1) for d_column in (0, 1)]
+
+
+class TileWriter():
+    """
+    Writer of the tiles of a pyramid deduplicating identical tiles, later
+    copies being hard links to the first file (copies where links are not
+    supported)
+    """
+
+    def __init__(self, output_dir):
+        """
+        Initialize the writer of tiles into output_dir
+        """
+        self.output_dir = output_dir
+        self.files = {}  # first file written of each tile digest
+        self.counts = {"written": 0, "linked": 0}
+
+    def write(self, zoom, column, row, data):
+        """
+        Write the png bytes data as the tile at column, row of zoom
+        """
+        filename = tile_path(self.output_dir, zoom, column, row)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        if os.path.exists(filename):
+            os.remove(filename)  # do not write through an older link
+        digest = hashlib.sha256(data).hexdigest()
+        original = self.files.get(digest)
+        if original is not None:
+            try:
+                os.link(original, filename)
+            except OSError:
+                shutil.copyfile(original, filename)
+            self.counts["linked"] += 1
+            return
+        with open(filename, "wb") as file:
+            file.write(data)
+        self.files[digest] = filename
+        self.counts["written"] += 1
+
+
+def render_pyramid(path, output_dir, max_zoom, depth=None,
+                   tile_size=TILE_SIZE, line_width=raster.DEFAULT_LINE_WIDTH,
+                   fill_rule=None, workers=None, report=None):
+    """
+    Render the curve of the json file path into the tiles of zoom 0 to
+    max_zoom in output_dir on workers processes (default number of cpus),
+    return the number of tiles written, linked and skipped as a dict
+
+    The curve is that of depth, by default the one whose details reach a
+    pixel at max_zoom (see FastFractal.auto_depth).
+    Tiles are rendered a zoom at a time, only under the tiles of the
+    previous zoom that were not blank. Tiles under a fully covered tile
+    are still rendered: lines keep their width in pixels and detail
+    below a pixel is pruned, so gaps may open up when zooming in.
+    report(zoom, counts) is called after each zoom. The extent of the
+    pyramid is saved into output_dir/tiles.json
+    """
+    fractal = load_fractal(path)
+    if depth is None:
+        depth = fractal.auto_depth(tile_size * 2**max_zoom)
+    square = world_square(fractal.bounding_box(depth))
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "tiles.json"), "w") as file:
+        json.dump({"tile_size": tile_size, "min_zoom": 0,
+                   "max_zoom": max_zoom, "depth": depth,
+                   "extent": square[:2] + (square[0] + square[2],
+                                           square[1] + square[2])},
+                  file, indent=2)
+    writer = TileWriter(output_dir)
+    counts = {"written": 0, "linked": 0, "skipped": 0}
+    tiles = [(0, 0)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for zoom in range(max_zoom + 1):
+            futures = [(column, row, executor.submit(
+                render_tile, path, depth, square, zoom, column, row,
+                tile_size, line_width, fill_rule))
+                       for column, row in tiles]
+            next_tiles = []
+            for column, row, future in futures:
+                data = future.result()
+                if data is None:
+                    counts["skipped"] += 1
+                    continue
+                writer.write(zoom, column, row, data)
+                next_tiles.extend(children(column, row))
+            counts["skipped"] += 4**zoom - len(futures)
+            tiles = next_tiles
+            counts.update(writer.counts)
+            if report is not None:
+                report(zoom, dict(counts))
+    return counts
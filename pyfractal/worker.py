@@ -0,0 +1,79 @@
+"""Module for generating curves in the background of the GUI mainloop"""
+import queue
+import threading
+from .instrument import RECORDER
+
+QUEUED_ITEMS = 8  # items generated ahead of their consumer
+PUT_TIMEOUT = 0.05  # seconds between checks for cancellation when full
+
+
+class Worker():
+    """
+    Pull the items of an iterable on a background thread into a bounded
+    thread safe queue, from which the mainloop takes them without blocking
+
+    The iterable is returned by generate(progress), progress(fraction)
+    being a callback recording the fraction of the work done
+    """
+
+    def __init__(self, generate, max_queued=QUEUED_ITEMS):
+        """
+        Start generating the items on a daemon thread
+        """
+        self.items = queue.Queue(max_queued)
+        self.progress = 0.0  # fraction of the work done
+        self.is_cancelled = threading.Event()
+        self.error = None  # exception raised by the generation
+        self.thread = threading.Thread(
+            target=RECORDER.profiled, args=(self.run, generate), daemon=True)
+        self.thread.start()
+
+    def run(self, generate):
+        """
+        Thread: put the generated items on the queue followed by None
+        """
+        try:
+            for item in generate(self.set_progress):
+                if not self.put(item):
+                    return
+        except Exception as error:  # raised again in the mainloop
+            self.error = error
+        self.put(None)
+
+    def put(self, item):
+        """
+        Thread: wait for room on the queue for item, return False if
+        cancelled in the meantime
+        """
+        while not self.is_cancelled.is_set():
+            try:
+                self.items.put(item, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def set_progress(self, fraction):
+        """
+        Thread: record the fraction of the work done
+        """
+        self.progress = fraction
+
+    def get(self):
+        """
+        Return the next item, raise queue.Empty if it is not generated
+        yet, StopIteration after the last one, and the exception of
+        the generation if it failed
+        """
+        item = self.items.get_nowait()
+        if item is None:
+            if self.error is not None:
+                raise self.error
+            raise StopIteration
+        return item
+
+    def cancel(self):
+        """
+        Stop the generation, the thread ends once done with its item
+        """
+        self.is_cancelled.set()
@@ -22,6 +22,9 @@ setuptools.setup(
         "Operating System :: OS Independent",
         "Development Status :: 4 - Beta",
     ],
-    install_requires=['Pillow>=7.0.0','tk>=0.0.1','canvasvg>=1.0.0'],
-    python_requires='>=3.5',
+    install_requires=['Pillow>=7.0.0','tk>=0.0.1','canvasvg>=1.0.0','numpy>=1.16.0'],
+    python_requires='>=3.8',
+    entry_points={
+        'console_scripts': ['pyfractal=pyfractal.cli:main'],
+    },
 )
@@ -0,0 +1,31 @@
+"""Tests of the cost estimates and budget of curves"""
+import math
+import os
+import pytest
+from pyfractal.fastfractal import FastFractal, BudgetExceededError, \
+    load_fractal
+
+CURVE = os.path.join(os.path.dirname(__file__), os.pardir, "pyfractal",
+                     "curves", "19_Curve2_FractalFlower.json")
+
+
+def test_huge_curves_are_refused():
+    """
+    Curves too large for a float have an infinite estimated time and are
+    refused by the budget rather than raising OverflowError
+    """
+    fractal = load_fractal(CURVE)
+    cost = fractal.estimate_cost(300)
+    assert cost.points > 10**300 and math.isinf(cost.seconds)
+    fractal.set_budget(max_bytes=2**31, max_seconds=120)
+    with pytest.raises(BudgetExceededError):
+        fractal.check_budget(300)
+
+
+def test_empty_rules_have_the_start_point():
+    """
+    Without rules the curve is its start point
+    """
+    fractal = FastFractal(None)
+    assert fractal.estimate_cost(5).points == 1
+    assert len(list(fractal.iter_points(5))) == 1
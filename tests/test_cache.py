@@ -0,0 +1,90 @@
+"""Tests of the persistent cache of curves"""
+import os
+import time
+import numpy as np
+from pyfractal import cache
+
+N_POINTS = cache.MIN_DISK_CACHE_POINTS  # smallest curve stored
+
+
+def curve(value):
+    """
+    Return a curve of N_POINTS points filled with value
+    """
+    return np.full((N_POINTS, 2), value, dtype=np.float64)
+
+
+def test_round_trip(tmp_path):
+    """
+    A stored curve is loaded back memory mapped, read only and equal,
+    without temporary files left behind
+    """
+    disk_cache = cache.DiskCache(str(tmp_path))
+    points = np.arange(2 * N_POINTS, dtype=np.float64).reshape(-1, 2)
+    disk_cache.put("key", 5, points)
+    loaded = disk_cache.get("key", 5)
+    assert isinstance(loaded, np.memmap)
+    assert not loaded.flags.writeable
+    assert np.array_equal(loaded, points)
+    assert disk_cache.get("key", 6) is None
+    assert disk_cache.get("other", 5) is None
+    assert [name for name in os.listdir(str(tmp_path))
+            if not name.endswith(".npy")] == []
+
+
+def test_small_curves_are_not_stored(tmp_path):
+    """
+    Curves faster to regenerate than to load are not stored
+    """
+    disk_cache = cache.DiskCache(str(tmp_path))
+    disk_cache.put("key", 1, curve(1.0)[:10])
+    assert disk_cache.get("key", 1) is None
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    """
+    Past max_bytes the least recently used curves are removed, loading a
+    curve marking it as used
+    """
+    size = curve(0.0).nbytes + 128  # with the .npy header
+    disk_cache = cache.DiskCache(str(tmp_path), max_bytes=2 * size)
+    now = time.time()
+    for level in (1, 2):
+        disk_cache.put("key", level, curve(level))
+        os.utime(disk_cache.path("key", level), (now - 100 + level,) * 2)
+    assert disk_cache.get("key", 1) is not None  # now the most recent
+    disk_cache.put("key", 3, curve(3.0))
+    assert disk_cache.get("key", 2) is None
+    assert disk_cache.get("key", 1)[0, 0] == 1.0
+    assert disk_cache.get("key", 3)[0, 0] == 3.0
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+    """
+    Temporary files left by interrupted writes are removed once stale
+    """
+    disk_cache = cache.DiskCache(str(tmp_path))
+    stale = tmp_path / "left.tmp"
+    stale.write_bytes(b"partial")
+    old = time.time() - cache.STALE_SECONDS - 1
+    os.utime(str(stale), (old, old))
+    disk_cache.put("key", 1, curve(1.0))
+    assert not stale.exists()
+
+
+def test_corrupt_and_partial_files_are_dropped(tmp_path):
+    """
+    Unreadable or truncated files are misses and are removed
+    """
+    disk_cache = cache.DiskCache(str(tmp_path))
+    path = disk_cache.path("key", 1)
+    with open(path, "wb") as file:
+        file.write(b"not a npy file")
+    assert disk_cache.get("key", 1) is None
+    assert not os.path.exists(path)
+    disk_cache.put("key", 2, curve(2.0))
+    path = disk_cache.path("key", 2)
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) // 2)
+    assert disk_cache.get("key", 2) is None
+    assert not os.path.exists(path)
@@ -0,0 +1,83 @@
+"""Tests of the command line rendering"""
+import json
+import os
+from pyfractal import cli
+from pyfractal.cache import GEOMETRY_VERSION
+
+CURVE = os.path.join(os.path.dirname(__file__), os.pardir, "pyfractal",
+                     "curves", "3_TerDragon.json")
+
+
+def render(output_dir, *options):
+    """
+    Render CURVE at depth 3 as png and svg into output_dir with options,
+    return the exit status
+    """
+    return cli.main(["render", CURVE, "-d", "3", "-f", "png", "svg",
+                     "-o", output_dir, "-j", "1", "-s", "64"] +
+                    list(options))
+
+
+def modification_times(output_dir):
+    """
+    Return the modification time of the outputs of output_dir by name
+    """
+    return {name: os.stat(os.path.join(output_dir, name)).st_mtime_ns
+            for name in ("3_TerDragon_3.png", "3_TerDragon_3.svg")}
+
+
+def test_manifest_records_the_outputs(tmp_path):
+    """
+    Each output is recorded in the manifest with its render parameters
+    """
+    assert render(str(tmp_path)) == 0
+    with open(str(tmp_path / cli.RENDER_MANIFEST)) as file:
+        manifest = json.load(file)
+    assert sorted(manifest) == ["3_TerDragon_3.png", "3_TerDragon_3.svg"]
+    for name, size in (("3_TerDragon_3.png", [64, 64]),
+                       ("3_TerDragon_3.svg", None)):
+        assert os.path.exists(str(tmp_path / name))
+        assert manifest[name] == {
+            "curve": os.path.abspath(CURVE),
+            "depth": 3,
+            "size": size,
+            "geometry": GEOMETRY_VERSION,
+            "version": cli.package_version()
+        }
+
+
+def test_unchanged_outputs_are_skipped(tmp_path, capsys):
+    """
+    Outputs rendered with the same parameters are skipped, changing the
+    size renders the png again but not the svg, forcing renders both
+    """
+    output_dir = str(tmp_path)
+    render(output_dir)
+    first = modification_times(output_dir)
+    capsys.readouterr()
+    assert render(output_dir) == 0
+    assert capsys.readouterr().out.count("up to date") == 2
+    assert modification_times(output_dir) == first
+    render(output_dir, "-s", "32")
+    second = modification_times(output_dir)
+    assert second["3_TerDragon_3.png"] != first["3_TerDragon_3.png"]
+    assert second["3_TerDragon_3.svg"] == first["3_TerDragon_3.svg"]
+    with open(str(tmp_path / cli.RENDER_MANIFEST)) as file:
+        assert json.load(file)["3_TerDragon_3.png"]["size"] == [32, 32]
+    render(output_dir, "-s", "32", "--force")
+    assert all(before != after for before, after in zip(
+        second.values(), modification_times(output_dir).values()))
+
+
+def test_unreadable_manifest_renders_again(tmp_path, capsys):
+    """
+    Without a readable manifest the outputs are rendered again
+    """
+    output_dir = str(tmp_path)
+    render(output_dir)
+    (tmp_path / cli.RENDER_MANIFEST).write_text("not json")
+    capsys.readouterr()
+    render(output_dir)
+    assert "up to date" not in capsys.readouterr().out
+    with open(str(tmp_path / cli.RENDER_MANIFEST)) as file:
+        assert len(json.load(file)) == 2
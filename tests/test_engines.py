@@ -0,0 +1,73 @@
+"""Tests of the engines against the python engine on the bundled curves"""
+import glob
+import os
+import numpy as np
+import pytest
+from pyfractal.fastfractal import load_fractal
+
+CURVES = sorted(glob.glob(os.path.join(
+    os.path.dirname(__file__), os.pardir, "pyfractal", "curves", "*.json")))
+MAX_POINTS = 20000  # largest curve generated by the python engine
+DEPTHS = (1, 2, 3, 4)
+
+
+def depths(fractal):
+    """
+    Return the depths of the curve small enough for the python engine
+    """
+    return [depth for depth in DEPTHS
+            if depth == 1 or
+            fractal.estimate_cost(depth).points <= MAX_POINTS]
+
+
+@pytest.fixture(params=CURVES, ids=lambda path: os.path.basename(path))
+def fractal(request):
+    """
+    The fractal of a bundled curve
+    """
+    return load_fractal(request.param)
+
+
+def test_numpy_engine(fractal):
+    """
+    The numpy engine returns the points of the python engine
+    """
+    for depth in depths(fractal):
+        expected = np.array(fractal.fractal_curve(depth, engine="python"))
+        curve = np.array(fractal.fractal_curve(depth, engine="numpy"))
+        assert curve.shape == expected.shape
+        assert np.allclose(curve, expected)
+
+
+def test_iter_points(fractal):
+    """
+    The streamed chunks are the points of the python engine in order
+    """
+    for depth in depths(fractal):
+        expected = np.array(fractal.fractal_curve(depth, engine="python"))
+        chunks = list(fractal.iter_points(depth, chunk_size=1000))
+        assert all(len(chunk) == 1000 for chunk in chunks[:-1])
+        assert np.allclose(np.concatenate(chunks), expected)
+
+
+def test_points_at(fractal):
+    """
+    Random access returns the points of the python engine, negative
+    indices counting from the end
+    """
+    for depth in depths(fractal):
+        expected = np.array(fractal.fractal_curve(depth, engine="python"))
+        indices = np.arange(len(expected))
+        assert np.allclose(fractal.points_at(depth, indices), expected)
+        assert np.allclose(fractal.points_at(depth, [-1]), expected[-1:])
+
+
+def test_bounds(fractal):
+    """
+    The analytic bounding box is that of the points of the python engine
+    """
+    for depth in depths(fractal):
+        expected = np.array(fractal.fractal_curve(depth, engine="python"))
+        assert np.allclose(
+            fractal.bounding_box(depth),
+            tuple(expected.min(axis=0)) + tuple(expected.max(axis=0)))
@@ -0,0 +1,51 @@
+"""Tests of the curves generated out of core"""
+import os
+import numpy as np
+import pytest
+from pyfractal import outofcore
+from pyfractal.fastfractal import load_fractal
+
+CURVE = os.path.join(os.path.dirname(__file__), os.pardir, "pyfractal",
+                     "curves", "3_Curve5_Horse.json")
+
+
+def test_out_of_core_curve_equals_fractal_array(tmp_path):
+    """
+    The curve generated into a file and read back in chunks is the
+    curve generated in memory
+    """
+    fractal = load_fractal(CURVE)
+    fractal.set_out_of_core(str(tmp_path))
+    for depth in (1, 3, 5):
+        chunks = list(fractal.iter_points(depth, chunk_size=1000))
+        assert np.allclose(np.concatenate(chunks),
+                           load_fractal(CURVE).fractal_array(depth))
+    assert len(os.listdir(str(tmp_path))) == 3
+
+
+def test_windows_and_chunks(tmp_path):
+    """
+    Chunks of any size written through small windows are read back
+    """
+    points = np.arange(2 * 1234, dtype=np.float64).reshape(-1, 2)
+    chunks = [points[start:start + 77] for start in range(0, 1234, 77)]
+    filename = str(tmp_path / "curve.npy")
+    outofcore.write_npy(filename, chunks, len(points), window_points=100)
+    assert outofcore.npy_points(filename) == len(points)
+    assert np.array_equal(np.load(filename), points)
+    read = list(outofcore.iter_npy(filename, chunk_size=500))
+    assert [len(chunk) for chunk in read] == [500, 500, 234]
+    assert np.array_equal(np.concatenate(read), points)
+
+
+def test_wrong_size_leaves_no_file(tmp_path):
+    """
+    Chunks not holding the announced points raise ValueError without
+    leaving a (partial or temporary) file
+    """
+    filename = str(tmp_path / "curve.npy")
+    with pytest.raises(ValueError):
+        outofcore.write_npy(filename, [np.zeros((10, 2))], 20)
+    with pytest.raises(ValueError):
+        outofcore.write_npy(filename, [np.zeros((30, 2))], 20)
+    assert os.listdir(str(tmp_path)) == []
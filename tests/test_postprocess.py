@@ -0,0 +1,95 @@
+"""Tests of the post processing of curves"""
+import numpy as np
+from pyfractal import postprocess
+
+DRIFT = np.c_[np.linspace(0, 10, 101), np.zeros(101)]  # steps of 0.1
+
+
+def test_slow_drift_is_thinned_not_dropped():
+    """
+    Near repeats are measured from the last point kept, a drift made of
+    steps within tolerance keeps a point every tolerance and its end
+    """
+    curve = postprocess.remove_repeated_points(DRIFT, tolerance=0.5)
+    assert len(curve) > 2
+    assert (curve[0] == DRIFT[0]).all() and (curve[-1] == DRIFT[-1]).all()
+    steps = np.hypot(*np.diff(curve[:-1], axis=0).T)
+    assert (steps > 0.5).all()
+
+
+def test_post_processor_drift_matches_whole_curve():
+    """
+    The streamed post processor keeps the same points as the whole curve
+    whatever the chunks
+    """
+    expected = postprocess.remove_repeated_points(DRIFT, tolerance=0.5)
+    for size in (1, 7, 37, 101):
+        processor = postprocess.PostProcessor(
+            tolerance=0.5, merge_collinear=False)
+        points = [processor.feed(DRIFT[start:start + size])
+                  for start in range(0, len(DRIFT), size)]
+        points = np.concatenate(points + [processor.flush()])
+        assert np.array_equal(points, expected)
+
+
+def test_exact_repeats():
+    """
+    Without tolerance only exact repeats are dropped
+    """
+    curve = np.array([[0, 0], [0, 0], [1, 1], [1, 1], [1, 2]])
+    assert postprocess.remove_repeated_points(curve).tolist() == \
+        [[0, 0], [1, 1], [1, 2]]
+
+
+def polyline_distances(points, polyline):
+    """
+    Return the distance of each of points to the polyline
+    """
+    start, end = polyline[:-1], polyline[1:]
+    direction = end - start
+    length2 = np.maximum((direction**2).sum(axis=1), 1e-300)
+    relative = points[:, np.newaxis] - start
+    ratio = np.clip((relative * direction).sum(axis=2) / length2, 0, 1)
+    nearest = start + ratio[..., np.newaxis] * direction
+    return np.hypot(*(points[:, np.newaxis] - nearest).T).min(axis=0)
+
+
+def random_walk(n_points, seed=0):
+    """
+    Return a random walk of n_points with unit steps on average
+    """
+    steps = np.random.default_rng(seed).normal(size=(n_points, 2))
+    return np.cumsum(steps, axis=0)
+
+
+def test_douglas_peucker_within_tolerance():
+    """
+    Douglas-Peucker keeps the end points and every point dropped is
+    within tolerance of the simplified polyline
+    """
+    curve = random_walk(500)
+    for tolerance in (0.1, 1.0, 5.0):
+        is_kept = postprocess.douglas_peucker_mask(curve, tolerance)
+        assert is_kept[0] and is_kept[-1]
+        kept = np.flatnonzero(is_kept)
+        for start, end in zip(kept[:-1], kept[1:]):
+            distances = polyline_distances(
+                curve[start:end + 1], curve[[start, end]])
+            assert (distances <= tolerance + 1e-9).all()
+    assert postprocess.douglas_peucker_mask(curve, 1e-9).all()
+
+
+def test_simplifier_within_tolerance():
+    """
+    The streamed simplification keeps the end points and stays within
+    its tolerance of every point of the curve
+    """
+    curve = random_walk(2000, seed=1)
+    tolerance = 2.0
+    simplifier = postprocess.Simplifier(tolerance)
+    points = np.concatenate(
+        [simplifier.feed(curve[start:start + 300])
+         for start in range(0, len(curve), 300)] + [simplifier.flush()])
+    assert len(points) < len(curve)
+    assert (points[0] == curve[0]).all() and (points[-1] == curve[-1]).all()
+    assert (polyline_distances(curve, points) <= tolerance + 1e-9).all()
@@ -0,0 +1,90 @@
+"""Tests of the postscript writer"""
+import io
+import os
+import numpy as np
+from pyfractal import postscript
+from pyfractal.fastfractal import load_fractal
+
+CURVE = os.path.join(os.path.dirname(__file__), os.pardir, "pyfractal",
+                     "curves", "3_Curve5_Horse.json")
+
+
+def parse_postscript(text):
+    """
+    Return the paths (lists of points) of the postscript document text,
+    following its m and l operations, and the operators ending them
+    """
+    paths, operators = [], []
+    for line in text.splitlines():
+        words = line.split()
+        if len(words) == 3 and words[2] == "m":
+            paths.append([(float(words[0]), float(words[1]))])
+        elif len(words) == 3 and words[2] == "l":
+            paths[-1].append((float(words[0]), float(words[1])))
+        elif words[-1:] in (["s"], ["fill"], ["eofill"]):
+            operators.append(words[-1])
+    return paths, operators
+
+
+def test_paths_are_the_points():
+    """
+    The stroked paths, each starting where the previous ended and of at
+    most PATH_POINTS points, read back are the points whatever the chunks
+    """
+    points = np.random.default_rng(0).uniform(-50, 50, size=(2500, 2))
+    chunks = [points[start:start + size] for start, size in
+              ((0, 1), (1, 0), (1, 999), (1000, 1500))]
+    file = io.StringIO()
+    postscript.write_postscript(file, chunks, (-50, -50, 50, 50))
+    paths, operators = parse_postscript(file.getvalue())
+    assert len(paths) == len(operators) == 3
+    assert set(operators) == {"s"}
+    assert all(len(path) <= postscript.PATH_POINTS for path in paths)
+    for path, next_path in zip(paths[:-1], paths[1:]):
+        assert path[-1] == next_path[0]
+    parsed = np.array(paths[0] + [point for path in paths[1:]
+                                  for point in path[1:]])
+    assert np.allclose(parsed, np.round(points, 2), rtol=0, atol=1e-9)
+
+
+def test_filled_polygon_is_a_single_path():
+    """
+    A filled polygon is a single closed path filled with its rule
+    """
+    points = np.random.default_rng(1).uniform(0, 10, size=(2500, 2))
+    file = io.StringIO()
+    postscript.write_postscript(file, [points], (0, 0, 10, 10),
+                                fill_rule="evenodd")
+    paths, operators = parse_postscript(file.getvalue())
+    assert operators == ["eofill"]
+    assert np.allclose(paths[0], np.round(points, 2), rtol=0, atol=1e-9)
+
+
+def test_fractal_postscript(tmp_path):
+    """
+    A fractal saved as encapsulated postscript is its exported points,
+    its bounding box holding them once translated and flipped
+    """
+    fractal = load_fractal(CURVE)
+    depth = 5
+    points = np.concatenate(list(fractal.export_points(
+        depth, tolerance=0.01)))
+    filename = str(tmp_path / "curve.eps")
+    fractal.save_postscript(filename, depth)
+    with open(filename) as file:
+        text = file.read()
+    assert text.startswith("%!PS-Adobe-3.0 EPSF-3.0\n")
+    paths, operators = parse_postscript(text)
+    assert len(paths) == len(operators) > 1
+    parsed = np.array(paths[0] + [point for path in paths[1:]
+                                  for point in path[1:]])
+    assert np.allclose(parsed, np.round(points, 2), rtol=0, atol=1e-9)
+    bounding_box = next(line for line in text.splitlines()
+                        if line.startswith("%%BoundingBox:"))
+    width, height = map(int, bounding_box.split()[3:])
+    translate = next(line for line in text.splitlines()
+                     if line.endswith("translate 1 -1 scale"))
+    x_offset, y_offset = map(float, translate.split()[:2])
+    page = (parsed[:, 0] + x_offset, y_offset - parsed[:, 1])
+    assert all(((0 <= values) & (values <= size + 0.01)).all()
+               for values, size in zip(page, (width, height)))
@@ -0,0 +1,71 @@
+"""Tests of the svg writer"""
+import gzip
+import io
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+import numpy as np
+from pyfractal import svg
+from pyfractal.fastfractal import load_fractal
+
+CURVE = os.path.join(os.path.dirname(__file__), os.pardir, "pyfractal",
+                     "curves", "3_Curve5_Horse.json")
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+PATH_COMMAND = re.compile(r"([MLlz])([^MLlz]*)")
+
+
+def parse_svg(text):
+    """
+    Return the svg element and the points of the path of the svg document
+    text, following its M, L and l commands
+    """
+    root = ElementTree.fromstring(text)
+    path = root.find(SVG_NAMESPACE + "path")
+    points = []
+    for command, numbers in PATH_COMMAND.findall(path.get("d")):
+        if command == "z":
+            continue
+        values = np.array(numbers.split(), dtype=np.float64).reshape(-1, 2)
+        if command == "l":
+            values = points[-1] + np.cumsum(values, axis=0)
+        points.extend(values)
+    return root, np.array(points)
+
+
+def test_path_is_the_points():
+    """
+    The path read back is the points rounded to the precision whatever
+    the chunks, with relative or absolute commands
+    """
+    points = np.random.default_rng(0).uniform(-50, 50, size=(500, 2))
+    chunks = [points[start:start + size] for start, size in
+              ((0, 1), (1, 0), (1, 123), (124, 376))]
+    for relative in (True, False):
+        for precision in (0, 2, 4):
+            file = io.StringIO()
+            svg.write_svg(file, chunks, (-50, -50, 50, 50), precision,
+                          relative)
+            root, parsed = parse_svg(file.getvalue())
+            assert np.allclose(parsed, np.round(points, precision),
+                               rtol=0, atol=1e-9)
+    assert root.get("viewBox") == "-51 -51 102 102"
+
+
+def test_fractal_svg(tmp_path):
+    """
+    A fractal saved as (compressed) svg is its exported points with a
+    view box holding its bounding box
+    """
+    fractal = load_fractal(CURVE)
+    depth = 4
+    points = np.concatenate(list(fractal.export_points(
+        depth, tolerance=0.01)))
+    for name, opener in (("curve.svg", open), ("curve.svgz", gzip.open)):
+        filename = str(tmp_path / name)
+        fractal.save_svg(filename, depth)
+        with opener(filename, "rt", encoding="utf-8") as file:
+            root, parsed = parse_svg(file.read())
+        assert np.allclose(parsed, np.round(points, 2), rtol=0, atol=1e-9)
+        x_min, y_min, width, height = map(float, root.get("viewBox").split())
+        assert (parsed >= (x_min, y_min)).all()
+        assert (parsed <= (x_min + width, y_min + height)).all()
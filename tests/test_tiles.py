@@ -0,0 +1,41 @@
+"""Tests of the tile pyramids"""
+import os
+import numpy as np
+from PIL import Image
+from pyfractal import tiles
+
+CURVE = os.path.join(os.path.dirname(__file__), os.pardir, "pyfractal",
+                     "curves", "4_PeanoSweep.json")
+
+
+def tile_pixels(filename):
+    """
+    Return the pixels of the png tile filename as an array
+    """
+    with Image.open(filename) as image:
+        return np.array(image.convert("L"))
+
+
+def test_tiles_under_covered_tiles_are_rendered(tmp_path):
+    """
+    Tiles under a fully covered tile are rendered, not copies of it: the
+    lines keep their width in pixels so that gaps open up at higher zooms
+    """
+    depth, tile_size, line_width = 5, 16, 3
+    tiles.render_pyramid(CURVE, str(tmp_path), 3, depth, tile_size,
+                         line_width, workers=1)
+    square = tiles.world_square(
+        tiles.worker_fractal(CURVE).bounding_box(depth))
+    for zoom in range(4):
+        for column in range(2**zoom):
+            for row in range(2**zoom):
+                filename = tiles.tile_path(str(tmp_path), zoom, column, row)
+                data = tiles.render_tile(CURVE, depth, square, zoom, column,
+                                         row, tile_size, line_width)
+                if data is None:
+                    assert not os.path.exists(filename)
+                    continue
+                with open(filename, "rb") as file:
+                    assert file.read() == data
+    assert (tile_pixels(tiles.tile_path(str(tmp_path), 2, 1, 1)) == 0).all()
+    assert (tile_pixels(tiles.tile_path(str(tmp_path), 3, 2, 2)) > 0).any()